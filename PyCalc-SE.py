@@ -1,55 +1,140 @@
 #!/usr/bin/env python3
+import time
+_STARTUP_T0 = time.perf_counter()
+import re
 import sys
-import math
 import os.path
-import requests
+import json
+from collections import deque
+if __name__ == "__main__" and sys.argv[1:2] == ["--cli"]:
+    # The terminal front end never needs Qt
+    import pycalc_cli
+    sys.exit(pycalc_cli.main(sys.argv[2:]))
+if __name__ == "__main__" and sys.argv[1:2] == ["--eval-file"]:
+    import pycalc_parallel
+    sys.exit(pycalc_parallel.main(sys.argv[2:]))
+if __name__ == "__main__" and any(arg in ("--single-instance", "--eval", "--quit") or arg.startswith("--eval=")
+                                   for arg in sys.argv[1:]):
+    # Hand off to a resident instance before paying for the Qt imports; whole
+    # option names only, so --eval-file is not taken for --eval
+    import pycalc_instance
+    _status = pycalc_instance.hand_off(sys.argv[1:])
+    if _status is not None:
+        sys.exit(_status)
 from PySide6.QtWidgets import (
-    QApplication, QWidget, QVBoxLayout, QGridLayout, QPushButton, QLabel, QSizePolicy
+    QApplication, QWidget, QVBoxLayout, QGridLayout, QPushButton, QLabel, QSizePolicy,
+    QLineEdit, QListView, QProxyStyle, QStyle
 )
-from PySide6.QtCore import Qt, QSettings
-from PySide6.QtGui import QIcon, QFontDatabase, QFont
+from PySide6.QtCore import (
+    Qt, QSettings, QObject, QTimer, QEvent, Signal, QAbstractListModel, QModelIndex, QStandardPaths
+)
+from PySide6.QtGui import QIcon, QFontDatabase, QFont, QGuiApplication, QPalette, QColor, QPainter
+from pycalc_engine import CalculatorEngine, fit_display, int_digits, UNDO_DEPTH, FUNCTION_KEYS
+from pycalc_update import fetch_latest_version, update_message
+import pycalc_compute
+_IMPORTS_DONE = time.perf_counter()
 
-UPDATE_VERSION_URL = "https://gist.githubusercontent.com/Chill-Astro/45fc2e5cce1c4e7c01b4f75a76121930/raw/7f865f4e71d559934be49b1d556db283434c6ec2/PyC_SE_V.txt"  # Gist URL
+# The live preview of '=' is worked out once typing pauses for this long;
+# previews that need the worker process get this long to finish
+PREVIEW_DELAY_MS = 150
+PREVIEW_TIME_LIMIT = 5.0
 
-class Calculator(QWidget):
-    def __init__(self):
-        super().__init__()
-        self.CURRENT_VERSION = "1.5" # Light Theme Support + Fixes
-        self.setWindowTitle("PyCalc - Simple Edition")            
-        self.setMinimumSize(340, 500)
-        icon_path = os.path.join(".", "Pycalc-SE.ico")
-        if os.path.exists(icon_path):
-            self.setWindowIcon(QIcon(icon_path))
-        # Load custom font Inter.ttf
-        font_id = QFontDatabase.addApplicationFont("Inter.ttf")
+UPDATE_VERSION_URL = os.environ.get("PYCALC_UPDATE_URL") or "https://gist.githubusercontent.com/Chill-Astro/45fc2e5cce1c4e7c01b4f75a76121930/raw/7f865f4e71d559934be49b1d556db283434c6ec2/PyC_SE_V.txt"  # Gist URL
+
+# Bundled files sit next to this script, wherever the calculator was launched from.
+# A frozen build looks in its unpack directory first, then next to the executable,
+# where the installer puts them.
+if getattr(sys, "frozen", False):
+    RESOURCE_DIRS = [os.path.dirname(os.path.abspath(sys.executable))]
+    if hasattr(sys, "_MEIPASS"):
+        RESOURCE_DIRS.insert(0, sys._MEIPASS)
+else:
+    RESOURCE_DIRS = [os.path.dirname(os.path.abspath(__file__))]
+
+def resource_path(name):
+    for directory in RESOURCE_DIRS:
+        path = os.path.join(directory, name)
+        if os.path.exists(path):
+            return path
+    return os.path.join(RESOURCE_DIRS[-1], name)
+
+_app_font_family = None
+_app_icon = None
+
+def app_font_family():
+    # Registers Inter.ttf with Qt once per process and returns its family name
+    global _app_font_family
+    if _app_font_family is None:
+        font_id = QFontDatabase.addApplicationFont(resource_path("Inter.ttf"))
         font_families = QFontDatabase.applicationFontFamilies(font_id)
-        if font_families:
-            custom_font = QFont(font_families[0], 14)
-            QApplication.instance().setFont(custom_font)
-            self.setFont(custom_font)
-        # Restore window geometry
-        self.settings = QSettings("ChillAstro", "PyCalc-SE")
-        geometry = self.settings.value("geometry")
-        if geometry:
-            self.restoreGeometry(geometry)
-        self.initUI()
-        self.apply_theme()
-        self.reset()
-        self.check_for_updates()
-        # --- Theme polling for runtime changes ---
-        from PySide6.QtCore import QTimer
-        self._last_theme = self._detect_os_theme()
-        self._theme_timer = QTimer(self)
-        self._theme_timer.timeout.connect(self._check_theme_change)
-        self._theme_timer.start(100)  # check every 0.1 seconds for more instant theme change
+        _app_font_family = font_families[0] if font_families else ""
+    return _app_font_family
 
-    def closeEvent(self, event):
-        # Save window geometry
-        self.settings.setValue("geometry", self.saveGeometry())
-        super().closeEvent(event)
+def app_icon():
+    # Loaded once and set on the application, so every window shares it
+    global _app_icon
+    if _app_icon is None:
+        icon_path = resource_path("PyCalc-SE.ico")
+        _app_icon = QIcon(icon_path) if os.path.exists(icon_path) else QIcon()
+    return _app_icon
 
-    def _detect_os_theme(self):
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1048576 if sys.platform == "darwin" else 1024), 1)
+
+class ThemeWatcher(QObject):
+    # Tracks the OS light/dark theme. Uses Qt's colorSchemeChanged notification when
+    # the platform reports a scheme, otherwise polls with exponential back-off.
+    theme_changed = Signal(str)
+
+    POLL_MIN_MS = 1000
+    POLL_MAX_MS = 30000
+
+    def __init__(self, parent=None, initial=None):
+        super().__init__(parent)
+        self.detect_calls = 0
+        self.subprocess_calls = 0
+        self._which_cache = {}
+        self._interval = self.POLL_MIN_MS
+        self._paused = True
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.timeout.connect(self._poll)
+        self._hints = QGuiApplication.styleHints()
+        self.event_driven = (
+            hasattr(self._hints, 'colorSchemeChanged')
+            and self._hints.colorScheme() != Qt.ColorScheme.Unknown
+        )
+        if self.event_driven:
+            self._hints.colorSchemeChanged.connect(self._on_color_scheme_changed)
+        # A remembered theme lets the first frame paint without spawning a process
+        if initial in ('dark', 'light') and not self.event_driven:
+            self.theme = initial
+        else:
+            self.theme = self.detect()
+
+    def _which(self, name):
+        # shutil.which walks PATH, so remember the answer
+        if name not in self._which_cache:
+            import shutil
+            self._which_cache[name] = shutil.which(name)
+        return self._which_cache[name]
+
+    def _run(self, args):
+        import subprocess
+        self.subprocess_calls += 1
+        return subprocess.run(args, capture_output=True, text=True).stdout
+
+    def detect(self):
         # Returns 'dark' or 'light'
+        self.detect_calls += 1
+        if self.event_driven:
+            return 'dark' if self._hints.colorScheme() == Qt.ColorScheme.Dark else 'light'
         try:
             if sys.platform == 'win32':
                 import winreg
@@ -57,18 +142,13 @@ class Calculator(QWidget):
                     value, _ = winreg.QueryValueEx(key, "AppsUseLightTheme")
                     return 'dark' if value == 0 else 'light'
             elif sys.platform == 'darwin':
-                import subprocess
-                result = subprocess.run([
-                    'defaults', 'read', '-g', 'AppleInterfaceStyle'
-                ], capture_output=True, text=True)
-                return 'dark' if 'Dark' in result.stdout else 'light'
+                output = self._run(['defaults', 'read', '-g', 'AppleInterfaceStyle'])
+                return 'dark' if 'Dark' in output else 'light'
             elif sys.platform.startswith('linux'):
                 # Try darkman if available
-                import shutil
-                if shutil.which('darkman'):
-                    import subprocess
-                    result = subprocess.run(['darkman', 'get'], capture_output=True, text=True)
-                    return 'dark' if 'dark' in result.stdout.lower() else 'light'
+                if self._which('darkman'):
+                    output = self._run(['darkman', 'get'])
+                    return 'dark' if 'dark' in output.lower() else 'light'
                 # Try GTK_THEME or XDG_CURRENT_DESKTOP heuristics
                 gtk_theme = os.environ.get('GTK_THEME', '').lower()
                 if 'dark' in gtk_theme:
@@ -79,14 +159,13 @@ class Calculator(QWidget):
                     return 'dark'
                 # Try XDG_CURRENT_DESKTOP for GNOME/KDE
                 desktop = os.environ.get('XDG_CURRENT_DESKTOP', '').lower()
-                if 'gnome' in desktop or 'kde' in desktop:
+                if ('gnome' in desktop or 'kde' in desktop) and self._which('gsettings'):
                     # Try to read gsettings (GNOME)
                     try:
-                        import subprocess
-                        result = subprocess.run([
+                        output = self._run([
                             'gsettings', 'get', 'org.gnome.desktop.interface', 'color-scheme'
-                        ], capture_output=True, text=True)
-                        if 'dark' in result.stdout.lower():
+                        ])
+                        if 'dark' in output.lower():
                             return 'dark'
                     except Exception:
                         pass
@@ -96,29 +175,403 @@ class Calculator(QWidget):
             return 'dark'
         return 'dark'
 
-    def _check_theme_change(self):
-        current_theme = self._detect_os_theme()
-        if current_theme != self._last_theme:
-            self._last_theme = current_theme
-            self.refresh_theme()
+    def _update(self, theme):
+        if theme != self.theme:
+            self.theme = theme
+            self.theme_changed.emit(theme)
+            return True
+        return False
 
-    def apply_theme(self):
-        is_dark = self._detect_os_theme() == 'dark'
-        if is_dark:
-            self.setStyleSheet(self.dark_stylesheet())
-            self._current_theme = 'dark'
+    def _on_color_scheme_changed(self, scheme):
+        self._update(self.detect())
+
+    def _poll(self):
+        if self._paused:
+            return
+        if self._update(self.detect()):
+            self._interval = self.POLL_MIN_MS
         else:
-            self.setStyleSheet(self.light_stylesheet())
-            self._current_theme = 'light'
-        self.update_label_styles()
+            self._interval = min(self._interval * 2, self.POLL_MAX_MS)
+        self._timer.start(self._interval)
 
-    def refresh_theme(self):
+    def pause(self):
+        # Called while the window is hidden or minimised
+        self._paused = True
+        self._timer.stop()
+
+    def resume(self):
+        if not self._paused:
+            return
+        self._paused = False
+        if self.event_driven:
+            return
+        # Catch up on anything missed while hidden, then poll quickly again
+        self._update(self.detect())
+        self._interval = self.POLL_MIN_MS
+        self._timer.start(self._interval)
+
+def history_db_path():
+    path = os.environ.get("PYCALC_HISTORY_DB")
+    if not path:
+        base = QStandardPaths.writableLocation(QStandardPaths.GenericDataLocation)
+        path = os.path.join(base, "ChillAstro", "PyCalc-SE", "history.sqlite3")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    return path
+
+class HistoryModel(QAbstractListModel):
+    # Loads history a page at a time as the view scrolls, newest first. Pages are
+    # read on the store's search thread and arrive through page_loaded, so a
+    # search scanning a long history never holds up the GUI.
+    PAGE_SIZE = 200
+    page_loaded = Signal(int, object)
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.entries = []
+        self.needle = ""
+        self._exhausted = False
+        self._loading = False
+        # Bumped on every filter change, so pages for an old filter are dropped
+        self._generation = 0
+        self.page_loaded.connect(self._on_page_loaded)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.entries)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self.entries[index.row()].text()
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted and not self._loading
+
+    def fetchMore(self, parent=QModelIndex()):
+        if self._loading or self._exhausted:
+            return
+        self._loading = True
+        before = self.entries[-1].id if self.entries else None
+        generation = self._generation
+        self.store.page_async(before, self.PAGE_SIZE, self.needle,
+                              lambda page: self.page_loaded.emit(generation, page))
+
+    def _on_page_loaded(self, generation, page):
+        if generation != self._generation:
+            return
+        self._loading = False
+        if len(page) < self.PAGE_SIZE:
+            self._exhausted = True
+        if page:
+            first = len(self.entries)
+            self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+            self.entries.extend(page)
+            self.endInsertRows()
+
+    def set_filter(self, needle):
+        self._generation += 1
+        self.store.cancel_reads()
+        self.beginResetModel()
+        self.needle = needle
+        self.entries = []
+        self._exhausted = False
+        self._loading = False
+        self.endResetModel()
+
+    def prepend(self, entry):
+        if self.needle and not entry.matches(self.needle):
+            return
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self.entries.insert(0, entry)
+        self.endInsertRows()
+
+class HistoryPanel(QWidget):
+    # Searchable history window; activating a row sends its result back to the calculator
+    result_chosen = Signal(str)
+
+    def __init__(self, store, parent=None):
+        super().__init__(parent, Qt.Tool)
+        # Follow the calculator's theme palette, as a child widget would
+        self.setAttribute(Qt.WA_WindowPropagation)
+        self.setWindowTitle("PyCalc-SE History")
+        self.resize(320, 420)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(8, 8, 8, 8)
+        self.search = QLineEdit()
+        self.search.setPlaceholderText("Search history")
+        self.search.setClearButtonEnabled(True)
+        layout.addWidget(self.search)
+        self.model = HistoryModel(store, self)
+        self.view = QListView()
+        self.view.setUniformItemSizes(True)
+        self.view.setModel(self.model)
+        layout.addWidget(self.view)
+        # Filter once typing pauses rather than on every character
+        self._search_timer = QTimer(self)
+        self._search_timer.setSingleShot(True)
+        self._search_timer.setInterval(150)
+        self._search_timer.timeout.connect(lambda: self.model.set_filter(self.search.text()))
+        self.search.textChanged.connect(self._search_timer.start)
+        self.view.activated.connect(self._on_activated)
+
+    def _on_activated(self, index):
+        self.result_chosen.emit(self.model.entries[index.row()].result)
+
+_RULE_RE = re.compile(r"([^{}]+)\{([^}]*)\}")
+
+
+def parse_stylesheet(css):
+    # {selector: {property: value}} for the flat rules used by the theme stylesheets
+    rules = {}
+    for selectors, body in _RULE_RE.findall(css):
+        props = {}
+        for declaration in body.split(';'):
+            name, _, value = declaration.partition(':')
+            if value.strip():
+                props[name.strip()] = value.strip()
+        for selector in selectors.split(','):
+            rules.setdefault(selector.strip(), {}).update(props)
+    return rules
+
+
+def theme_palettes(css, base):
+    # One palette per widget kind, built from the colours in a theme stylesheet
+    rules = parse_stylesheet(css)
+
+    def palette(colours):
+        result = QPalette(base)
+        for role, colour in colours.items():
+            if colour:
+                result.setColor(role, QColor(colour))
+        return result
+
+    background = rules.get('QWidget', {}).get('background')
+    text = rules.get('QLabel', {}).get('color')
+    muted = rules.get('QLabel#history', {}).get('color', text)
+    palettes = {
+        'window': palette({QPalette.Window: background, QPalette.Base: background, QPalette.Button: background,
+                           QPalette.WindowText: text, QPalette.Text: text, QPalette.ButtonText: text,
+                           QPalette.PlaceholderText: muted}),
+        'display': palette({QPalette.WindowText: rules.get('QLabel#display', {}).get('color', text)}),
+        'history': palette({QPalette.WindowText: muted}),
+    }
+    button = rules.get('QPushButton', {})
+    pressed = rules.get('QPushButton:pressed', {})
+    for role in ('', 'op', 'fn', 'eq'):
+        selector = f'QPushButton[{role}="true"]' if role else 'QPushButton'
+        normal = {**button, **rules.get(selector, {})}
+        down = {**pressed, **rules.get(selector + ':pressed', {})}
+        palettes[role] = palette({QPalette.Button: normal.get('background'), QPalette.ButtonText: normal.get('color'),
+                                  QPalette.Mid: down.get('background', normal.get('background'))})
+    return palettes
+
+
+class FlatButtonStyle(QProxyStyle):
+    # Draws push buttons as rounded rectangles in their own palette's colours
+    # (Button, or Mid while pressed), so a theme switch is just new palettes
+    def drawControl(self, element, option, painter, widget=None):
+        if element != QStyle.CE_PushButton:
+            return super().drawControl(element, option, painter, widget)
+        pressed = bool(option.state & QStyle.State_Sunken)
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(option.palette.color(QPalette.Mid if pressed else QPalette.Button))
+        painter.drawRoundedRect(option.rect, 5, 5)
+        painter.restore()
+        self.drawItemText(painter, option.rect, Qt.AlignCenter, option.palette, True, option.text, QPalette.ButtonText)
+
+
+class Calculator(QWidget):
+    first_frame_shown = Signal()
+    # Palettes per theme, parsed from the stylesheets once per process
+    _theme_cache = {}
+    # Keyboard input -> button token: by typed text first, then by key code
+    KEY_TEXT = {digit: digit for digit in '0123456789'}
+    KEY_TEXT.update({'+': '+', '-': '-', '*': '×', '/': '÷', '.': '.', '^': 'xʸ',
+                     '(': '(', ')': ')', 'c': 'C', 'C': 'C', '=': '='})
+    KEY_CODES = {Qt.Key_Enter: '=', Qt.Key_Return: '=', Qt.Key_Backspace: '⌫', Qt.Key_Delete: 'CE'}
+    CONTROL_KEYS = {Qt.Key_E: 'toggle_expression_mode', Qt.Key_H: 'toggle_history_panel', Qt.Key_C: 'copy_result',
+                    Qt.Key_V: 'paste_numbers', Qt.Key_Z: 'undo', Qt.Key_Y: 'redo'}
+
+    def __init__(self, check_updates=True):
+        super().__init__()
+        self.CURRENT_VERSION = "1.5" # Light Theme Support + Fixes
+        self.setWindowTitle("PyCalc - Simple Edition")            
+        self.setMinimumSize(340, 500)
+        icon = app_icon()
+        if not icon.isNull():
+            QApplication.instance().setWindowIcon(icon)
+        # Load custom font Inter.ttf
+        self._font_family = app_font_family()
+        if self._font_family:
+            custom_font = QFont(self._font_family, 14)
+            QApplication.instance().setFont(custom_font)
+            self.setFont(custom_font)
+        # Restore window geometry
+        self.settings = QSettings("ChillAstro", "PyCalc-SE")
+        geometry = self.settings.value("geometry")
+        if geometry:
+            self.restoreGeometry(geometry)
+        self.engine = CalculatorEngine()
+        self.engine.result_listener = self._record_result
+        self.engine.enable_undo(int(self.settings.value("undo/depth", UNDO_DEPTH)))
+        # Expensive '=' jobs run in a worker process, within these limits
+        self.compute = None
+        self._compute_job = None
+        self.compute_time_limit = float(self.settings.value("compute/time_limit", pycalc_compute.DEFAULT_TIME_LIMIT))
+        self.engine.max_result_digits = int(self.settings.value("compute/max_digits", pycalc_compute.DEFAULT_MAX_DIGITS))
+        self._compute_timer = QTimer(self)
+        self._compute_timer.setInterval(20)
+        self._compute_timer.timeout.connect(self._poll_computation)
+        # --eval requests from later launches (single-instance mode) wait their
+        # turn for a worker process of their own, so the window never waits on them
+        self.eval_compute = None
+        self._eval_requests = deque()
+        self._eval_timer = QTimer(self)
+        self._eval_timer.setInterval(20)
+        self._eval_timer.timeout.connect(self._poll_eval)
+        # Live preview of what '=' would show: debounced, cached by operation,
+        # large ones in a second worker process so '=' never waits behind them
+        self.show_preview = self.settings.value("display/preview", True, type=bool)
+        self.preview_compute = None
+        self._preview_job = None
+        self._preview_key = None
+        self._preview_cache = pycalc_compute.ResultCache()
+        self._preview_timer = QTimer(self)
+        self._preview_timer.setSingleShot(True)
+        self._preview_timer.setInterval(PREVIEW_DELAY_MS)
+        self._preview_timer.timeout.connect(self._update_preview)
+        self._preview_poll_timer = QTimer(self)
+        self._preview_poll_timer.setInterval(20)
+        self._preview_poll_timer.timeout.connect(self._poll_preview)
+        self.history_store = None
+        self.history_panel = None
+        # The display holds as many characters as fit its width; both are cached
+        self.group_digits = self.settings.value("display/group_digits", False, type=bool)
+        self._display_chars = None
+        self._display_cache = None
+        # Theme tracking: Qt colour-scheme events, or a backed-off poll as fallback
+        self.theme_watcher = ThemeWatcher(self, initial=self.settings.value("theme"))
+        self.theme_watcher.theme_changed.connect(self._on_theme_changed)
+        self._current_theme = None
+        self.initUI()
         self.apply_theme()
+        self.reset()
+        # Network and subprocess work waits until the first frame is on screen
+        self._check_updates = check_updates
+        self._first_frame_done = False
+        self.first_frame_time = None
+
+    def closeEvent(self, event):
+        # Save window geometry
+        self.settings.setValue("geometry", self.saveGeometry())
+        self.theme_watcher.pause()
+        if self.history_store is not None:
+            self.history_store.flush()
+        if os.environ.get("PYCALC_THEME_STATS"):
+            print(f"Theme detection calls: {self.theme_watcher.detect_calls}, "
+                  f"subprocesses: {self.theme_watcher.subprocess_calls}", file=sys.stderr)
+        super().closeEvent(event)
+
+    def _detect_os_theme(self):
+        return self.theme_watcher.detect()
+
+    def _on_theme_changed(self, theme):
+        self.refresh_theme()
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.first_frame_time is None:
+            self.first_frame_time = time.perf_counter()
+            QTimer.singleShot(0, self._after_first_frame)
+
+    def _after_first_frame(self):
+        self._first_frame_done = True
+        if self.isVisible() and not self.isMinimized():
+            self.theme_watcher.resume()
+        if self._check_updates:
+            self.check_for_updates()
+        self._open_history()
+        self.first_frame_shown.emit()
+
+    def _open_history(self):
+        if self.history_store is None:
+            from pycalc_history import HistoryStore
+            try:
+                self.history_store = HistoryStore(history_db_path())
+                QApplication.instance().aboutToQuit.connect(self.history_store.close)
+            except Exception:
+                # History is a convenience; the calculator works without it
+                self.history_store = None
+        return self.history_store
 
-    def update_label_styles(self):
-        # Remove inline color styles so stylesheet takes effect
-        self.display.setStyleSheet("font-size: 30px; font-weight: bold; padding-right: 0.5px;")
-        self.history.setStyleSheet("font-size: 12px; padding-top: 20px;")
+    def _record_result(self, expression, result):
+        store = self._open_history()
+        if store is None:
+            return
+        entry = store.append(expression, result)
+        if self.history_panel is not None:
+            self.history_panel.model.prepend(entry)
+
+    def toggle_history_panel(self):
+        if self.history_panel is None:
+            if self._open_history() is None:
+                return
+            self.history_panel = HistoryPanel(self.history_store, self)
+            self.history_panel.result_chosen.connect(self._use_history_result)
+        if self.history_panel.isVisible():
+            self.history_panel.hide()
+        else:
+            self.history_panel.show()
+            self.history_panel.raise_()
+
+    def _use_history_result(self, text):
+        # While a result is being computed the engine must stay as it was
+        if self._compute_job is None and self.engine.load_text(text):
+            self.update_display()
+
+    def showEvent(self, event):
+        if self._first_frame_done:
+            self.theme_watcher.resume()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self.theme_watcher.pause()
+        super().hideEvent(event)
+
+    def changeEvent(self, event):
+        if event.type() == QEvent.WindowStateChange:
+            if self.isMinimized():
+                self.theme_watcher.pause()
+            elif self.isVisible() and self._first_frame_done:
+                self.theme_watcher.resume()
+        super().changeEvent(event)
+
+    def apply_theme(self):
+        theme = 'dark' if self.theme_watcher.theme == 'dark' else 'light'
+        if theme == self._current_theme:
+            return
+        palettes = self.theme_palettes(theme)
+        # Only palettes change, so nothing is re-polished: each widget just repaints
+        self.setPalette(palettes['window'])
+        self.display.setPalette(palettes['display'])
+        self.history.setPalette(palettes['history'])
+        self.preview.setPalette(palettes['history'])
+        for btn, role in self._button_roles:
+            btn.setPalette(palettes[role])
+        self._current_theme = theme
+        self.settings.setValue("theme", theme)
+
+    def theme_palettes(self, theme):
+        palettes = self._theme_cache.get(theme)
+        if palettes is None:
+            css = self.dark_stylesheet() if theme == 'dark' else self.light_stylesheet()
+            palettes = self._theme_cache[theme] = theme_palettes(css, QApplication.instance().palette())
+        return palettes
+
+    def refresh_theme(self):
+        self.apply_theme()
 
     def dark_stylesheet(self):
         return """
@@ -166,22 +619,27 @@ class Calculator(QWidget):
         self.history = QLabel("")
         self.history.setObjectName("history")
         self.history.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
-        self.history.setStyleSheet("font-size: 12px; padding-top: 20px;")
-        font_id = QFontDatabase.addApplicationFont("Inter.ttf")
-        font_families = QFontDatabase.applicationFontFamilies(font_id)
-        if font_families:
-            self.history.setFont(QFont(font_families[0], 12))
+        self.history.setContentsMargins(0, 20, 0, 0)
+        self.history.setFont(self._pixel_font(12))
         vbox.addWidget(self.history)
 
         self.display = QLabel("0")
         self.display.setObjectName("display")
         self.display.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
         self.display.setMinimumHeight(75)
-        self.display.setStyleSheet("font-size: 30px; font-weight: bold; padding-right: 0.5px;")
-        if font_families:
-            self.display.setFont(QFont(font_families[0], 28, QFont.Bold))
+        self.display.setFont(self._pixel_font(30, bold=True))
+        self.display.installEventFilter(self)
         vbox.addWidget(self.display)
 
+        self.preview = QLabel("")
+        self.preview.setObjectName("preview")
+        self.preview.setAlignment(Qt.AlignRight | Qt.AlignVCenter)
+        self.preview.setFont(self._pixel_font(14))
+        # Fixed height, so the buttons don't move as the preview comes and goes
+        self.preview.setFixedHeight(self.preview.fontMetrics().height())
+        self.preview.setVisible(self.show_preview)
+        vbox.addWidget(self.preview)
+
         grid = QGridLayout()
         grid.setSpacing(6)
         vbox.addLayout(grid)
@@ -196,12 +654,15 @@ class Calculator(QWidget):
         ]
 
         self.button_map = {}
+        self._button_roles = []
+        self._button_style = FlatButtonStyle()
+        button_font = self._pixel_font(15)
         for i, row in enumerate(buttons):
             for j, (text, role) in enumerate(row):
                 btn = QPushButton(text)
                 btn.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
-                if font_families:
-                    btn.setFont(QFont(font_families[0], 16))
+                btn.setStyle(self._button_style)
+                btn.setFont(button_font)
                 if role == 'op':
                     btn.setProperty('op', True)
                 elif role == 'eq':
@@ -211,318 +672,356 @@ class Calculator(QWidget):
                 btn.clicked.connect(lambda _, t=text: self.on_button(t))
                 grid.addWidget(btn, i, j)
                 self.button_map[text] = btn
+                self._button_roles.append((btn, role))
+
+    def _pixel_font(self, size, bold=False):
+        font = QFont(self._font_family) if self._font_family else QFont(self.font())
+        font.setPixelSize(size)
+        font.setBold(bold)
+        return font
 
     def reset(self):
-        self.expression_history = ""
-        self.current_input = "0"
-        self.full_expression = ""
-        self.result_pending = False
-        self._currentNumber = 0.0
-        self._previousNumber = 0.0
-        self._currentOperator = ""
-        self._isNewNumberInput = True
-        self._hasDecimal = False
+        self.engine.record_undo()
+        self.engine.reset()
         self.update_display()
 
+    def eventFilter(self, obj, event):
+        if obj is self.display and event.type() == QEvent.Resize:
+            self._display_chars = None
+            if self._compute_job is None:
+                self._set_label(self.display, self._display_text())
+                if self.preview.text():
+                    self._update_preview()
+        return super().eventFilter(obj, event)
+
+    def display_chars(self):
+        # How many digits fit in the display at its current width and font
+        if self._display_chars is None:
+            self.display.ensurePolished()
+            advance = self.display.fontMetrics().horizontalAdvance('0') or 1
+            self._display_chars = max(8, self.display.contentsRect().width() // advance)
+        return self._display_chars
+
+    def _display_text(self):
+        source = self.engine.display_source()
+        chars = self.display_chars()
+        cache = self._display_cache
+        if cache is not None and cache[0] is type(source) and cache[1] == chars and cache[2] == source:
+            return cache[3]
+        text = fit_display(source, chars, self.group_digits)
+        self._display_cache = (type(source), chars, source, text)
+        return text
+
+    def _set_label(self, label, text):
+        # setText() relayouts the window even when the text is the same
+        if label.text() != text:
+            label.setText(text)
+
     def update_display(self):
-        if isinstance(self._currentNumber, float):
-            if self._currentNumber.is_integer() and not self._hasDecimal:
-                display_value = str(int(self._currentNumber))
-            else:
-                display_value = str(self._currentNumber)
-        else:
-            display_value = str(self._currentNumber)
-        self.display.setText(display_value)
-        self.history.setText(self.expression_history)
-
-    def clear_entry(self):
-        self.current_input = "0"
-        self._currentNumber = 0.0
-        self._isNewNumberInput = True
-        self._hasDecimal = False
-        self.update_display()
+        self._set_label(self.display, self._display_text())
+        history = self.engine.expression_history
+        if history:
+            history = self.history.fontMetrics().elidedText(history, Qt.ElideLeft, self.history.contentsRect().width())
+        self._set_label(self.history, history)
+        if self.show_preview:
+            # All a key press pays for: the preview waits until typing pauses
+            self._set_label(self.preview, "")
+            self._preview_timer.start()
 
-    def backspace(self):
-        if self.result_pending:
+    def _preview_executor(self):
+        if self.preview_compute is None:
+            self.preview_compute = pycalc_compute.ComputeExecutor(PREVIEW_TIME_LIMIT)
+            QApplication.instance().aboutToQuit.connect(self.preview_compute.shutdown)
+        return self.preview_compute
+
+    def _update_preview(self):
+        job = self.engine.pending_operation() if self._compute_job is None else None
+        key = pycalc_compute.job_key(job) if job is not None else None
+        self._preview_key = key
+        if self._preview_job is not None and self._preview_job[1] != key:
+            # The operands changed while it was running
+            self._cancel_preview()
+        if job is None:
+            self._set_label(self.preview, "")
             return
-        current_str = str(self._currentNumber)
-        if '.' in current_str:
-            parts = current_str.split('.')
-            if len(parts[0]) > 1:
-                new_str = parts[0][:-1] + ('.' + parts[1] if parts[1] else '')
-            else:
-                new_str = '0' + ('.' + parts[1] if parts[1] else '')
-            try:
-                self._currentNumber = float(new_str)
-                self._hasDecimal = '.' in new_str
-            except ValueError:
-                self._currentNumber = 0.0
-                self._hasDecimal = False
+        result = self._preview_cache.get(key)
+        if result is not None:
+            self._show_preview(job, result)
+            return
+        try:
+            digits = self.engine.job_digits(job)
+            if digits > self.engine.max_result_digits:
+                return
+            if self._preview_job is not None:
+                # This operation is already being worked out
+                return
+            if self._preview_executor().is_expensive(digits):
+                self.preview_compute.submit(job)
+                self._preview_job = (job, key)
+                self._preview_poll_timer.start()
+                return
+            result = pycalc_compute.run_job(job)
+        except Exception:
+            # '=' will show the error; the preview just stays empty
+            return
+        self._preview_cache.put(key, result)
+        self._show_preview(job, result)
+
+    def _poll_preview(self):
+        outcome = self.preview_compute.poll()
+        if outcome is None:
+            return
+        job, key = self._preview_job
+        self._preview_job = None
+        self._preview_poll_timer.stop()
+        status, value = outcome
+        if status != 'ok':
+            return
+        self._preview_cache.put(key, value)
+        # Anything typed since makes this result stale
+        if key == self._preview_key and not self._preview_timer.isActive() and self._compute_job is None:
+            self._show_preview(job, value)
+
+    def _cancel_preview(self):
+        self.preview_compute.cancel()
+        self._preview_job = None
+        self._preview_poll_timer.stop()
+
+    def _show_preview(self, job, result):
+        text = fit_display(self.engine.result_value(job, result), self.display_chars(), self.group_digits)
+        self._set_label(self.preview, "= " + text)
+
+    def copy_result(self):
+        # The display may be shortened; the clipboard always gets the whole value.
+        # While a result is being computed there is nothing to copy yet.
+        if self._compute_job is not None:
+            return
+        source = self.engine.display_source()
+        if type(source) is int and self._compute_executor().is_expensive(int_digits(source)):
+            self._run_in_worker(('text', source), "Copying…")
         else:
-            if len(current_str) > 1:
-                self._currentNumber = int(current_str[:-1])
-            else:
-                self._currentNumber = 0.0
-            self._hasDecimal = False
-        self._isNewNumberInput = False
+            QGuiApplication.clipboard().setText(self.engine.full_text())
+
+    def paste_numbers(self):
+        if self._compute_job is not None:
+            return
+        self.paste_text(QGuiApplication.clipboard().text())
+
+    def paste_text(self, text):
+        # One number is simply entered; a column of them becomes their sum, with
+        # the count, min, max and mean on the history line. Long pastes are
+        # summed in the worker process so the window keeps responding.
+        if self._compute_job is not None:
+            return
+        if not text or text.isspace():
+            return
+        import pycalc_paste
+        if len(text) > pycalc_paste.OFFLOAD_CHARS:
+            self._compute_executor()
+            self._run_in_worker(('paste', text, self.engine.max_result_digits), "Adding…")
+            return
+        try:
+            summary = pycalc_paste.summarize(text, self.engine.max_result_digits)
+        except (ValueError, OverflowError) as e:
+            self._paste_failed(str(e))
+            return
+        self._use_paste(summary)
+
+    def _use_paste(self, summary):
+        # The sum becomes the current number, so the next operator continues from it,
+        # or the second operand when an operator is pending
+        import pycalc_paste
+        history = pycalc_paste.history_text(summary)
+        self.engine.set_value(summary.total, history)
         self.update_display()
+        if history:
+            self._record_result(history, self.engine.display_text())
 
-    def input_digit(self, digit):
-        if self.result_pending:
-            self._currentNumber = int(digit)
-            self.expression_history = ""
-            self.full_expression = ""
-            self.result_pending = False
-            self._isNewNumberInput = False
-            self._hasDecimal = False
-        elif self._isNewNumberInput or self._currentNumber == 0:
-            if self._hasDecimal:
-                self._currentNumber = float(f"0.{digit}")
-            else:
-                self._currentNumber = int(digit)
-            self._isNewNumberInput = False
-        else:
-            current_str = str(self._currentNumber)
-            if self._hasDecimal:
-                if '.' in current_str:
-                    self._currentNumber = float(current_str + digit)
-                else:
-                    self._currentNumber = float(current_str + '.' + digit)
-            else:
-                self._currentNumber = float(current_str + digit) if '.' in current_str else int(current_str + digit)
+    def _paste_failed(self, message):
+        # The calculator keeps its state; the reason shows until the next key
+        self.update_display()
+        self._set_label(self.history, f"Paste: {message}")
+
+    def on_button(self, text):
+        if self._compute_job is not None:
+            # While a result is being computed only cancelling makes sense
+            if text == 'C':
+                self.cancel_computation()
+                self.reset()
+            return
+        if text == '=' and self._start_computation():
+            return
+        if text in FUNCTION_KEYS and self._start_function(text):
+            return
+        self.engine.press(text)
         self.update_display()
 
-    def input_decimal(self):
-        if self.result_pending:
-            self._currentNumber = 0.0
-            self.expression_history = ""
-            self.full_expression = ""
-            self.result_pending = False
-            self._isNewNumberInput = False
-            self._hasDecimal = True
-        if not self._hasDecimal:
-            self._hasDecimal = True
-            current_str = str(self._currentNumber)
-            if '.' not in current_str:
-                self._currentNumber = float(current_str + '.')
-            self._isNewNumberInput = False
+    def _start_computation(self):
+        # Hands '=' to the worker process when the result would be large; cheap
+        # results (and ones over the size limit, which fail at once) stay inline.
+        # A result the preview already worked out is used as it is.
+        job = self.engine.pending_operation()
+        if job is None:
+            return False
+        result = self._preview_cache.get(pycalc_compute.job_key(job))
+        if result is not None:
+            self.engine.record_undo()
+            self.engine.complete_result(job, result)
             self.update_display()
+            return True
+        digits = self.engine.job_digits(job)
+        if digits > self.engine.max_result_digits:
+            return False
+        if not self._compute_executor().is_expensive(digits):
+            return False
+        self._run_in_worker(job, "Calculating…")
+        return True
+
+    def _start_function(self, key):
+        # √x, ∛x and x² of a large int go to the worker process like '=' does;
+        # over the size limit they fail inline at once
+        job = self.engine.function_job(key)
+        if job is None:
+            return False
+        digits = self.engine.job_digits(job)
+        if digits > self.engine.max_result_digits:
+            return False
+        if not self._compute_executor().is_expensive(digits):
+            return False
+        self._run_in_worker(job, "Calculating…")
+        return True
+
+    def _compute_executor(self):
+        if self.compute is None:
+            self.compute = pycalc_compute.ComputeExecutor(self.compute_time_limit)
+            QApplication.instance().aboutToQuit.connect(self.compute.shutdown)
+        return self.compute
+
+    def _run_in_worker(self, job, busy_text):
+        self.compute.submit(job)
+        self._compute_job = job
+        self._busy_text = busy_text
+        self._compute_timer.start()
+        self.setCursor(Qt.BusyCursor)
+        self._set_label(self.display, busy_text)
+        self._set_label(self.history, "Press Esc to cancel")
 
-    def input_operator(self, op):
-        if not self._currentNumber and op != '-':
+    def _poll_computation(self):
+        outcome = self.compute.poll()
+        if outcome is None:
+            self._set_label(self.display, f"{self._busy_text} {int(self.compute.elapsed())}s")
             return
-        if not self._isNewNumberInput:
-            if self._currentOperator:
-                self.calculate_intermediate_result()
+        job = self._compute_job
+        self._finish_computation()
+        status, value = outcome
+        if job[0] == 'text':
+            # A copy finished (or failed); the calculator state never changed
+            if status == 'ok':
+                QGuiApplication.clipboard().setText(value)
+            self.update_display()
+            return
+        if job[0] == 'paste':
+            if status == 'ok':
+                self._use_paste(value)
             else:
-                self._previousNumber = self._currentNumber
-        visual_op = op.replace('**', '^').replace('*', '×').replace('/', '÷')
-        self.expression_history = f"{self._previousNumber} {visual_op} "
-        self._currentOperator = op
-        self._isNewNumberInput = True
-        self._hasDecimal = False
+                self._paste_failed(f"stopped after {self.compute.time_limit:g}s" if status == 'timeout' else value)
+            return
+        # The engine is as it was when '=' was pressed, so this is that key's undo step
+        self.engine.record_undo()
+        if status == 'ok':
+            self.engine.complete_result(job, value)
+        elif status == 'timeout':
+            self.engine.fail_job(job, f"Stopped after {self.compute.time_limit:g}s")
+        else:
+            self.engine.fail_job(job)
         self.update_display()
 
-    def calculate_intermediate_result(self):
-        if self._currentOperator:
-            try:
-                if self._currentOperator == '+':
-                    result = self._previousNumber + self._currentNumber
-                elif self._currentOperator == '-':
-                    result = self._previousNumber - self._currentNumber
-                elif self._currentOperator == '*':
-                    result = self._previousNumber * self._currentNumber
-                elif self._currentOperator == '/':
-                    if self._currentNumber == 0:
-                        self._currentNumber = "Error"
-                        self.expression_history = ""
-                        self._previousNumber = 0
-                        self._currentOperator = ""
-                        self._isNewNumberInput = True
-                        self.result_pending = False
-                        self._hasDecimal = False
-                        self.update_display()
-                        return
-                    result = self._previousNumber / self._currentNumber
-                if isinstance(result, float) and result.is_integer() and not self._hasDecimal:
-                    self._currentNumber = int(result)
-                else:
-                    self._currentNumber = result
-                self._previousNumber = self._currentNumber
-                self._isNewNumberInput = True
-                self._hasDecimal = False
-                self.update_display()
-            except Exception:
-                self.handle_calculation_error()
+    def _finish_computation(self):
+        self._compute_job = None
+        self._compute_timer.stop()
+        self.unsetCursor()
 
-    def calculate_result(self):
-        if self.result_pending or not self._currentOperator:
+    def cancel_computation(self):
+        # Leaves the calculator as it was before '=' was pressed
+        if self._compute_job is None:
             return
-        second_number = self._currentNumber
-        try:
-            if self._currentOperator == '+':
-                result = self._previousNumber + second_number
-            elif self._currentOperator == '-':
-                result = self._previousNumber - second_number
-            elif self._currentOperator == '*':
-                result = self._previousNumber * second_number
-            elif self._currentOperator == '/':
-                if second_number == 0:
-                    self._currentNumber = "Error"
-                    self.expression_history = ""
-                    self._previousNumber = 0
-                    self._currentOperator = ""
-                    self._isNewNumberInput = True
-                    self.result_pending = False
-                    self._hasDecimal = False
-                    self.update_display()
-                    return
-                result = self._previousNumber / second_number
-            elif self._currentOperator == '**':
-                result = self._previousNumber ** second_number
-            if isinstance(result, float) and result.is_integer() and not self._hasDecimal:
-                self._currentNumber = int(result)
-            else:
-                self._currentNumber = result
-            self.expression_history = f"{self._previousNumber} {self.get_visual_operator(self._currentOperator)} {second_number} ="
-            self.result_pending = True
-            self._isNewNumberInput = True
-            self._currentOperator = ""
-            self._previousNumber = self._currentNumber
-            self._hasDecimal = False
-            self.update_display()
-        except Exception:
-            self.handle_calculation_error()
-
-    def handle_calculation_error(self):
-        self._currentNumber = "Error"
-        self.expression_history = ""
-        self._previousNumber = 0
-        self._currentOperator = ""
-        self._isNewNumberInput = True
-        self.result_pending = False
-        self._hasDecimal = False
+        self.compute.cancel()
+        self._finish_computation()
         self.update_display()
 
-    def get_visual_operator(self, op):
-        return op.replace('**', '^').replace('*', '×').replace('/', '÷')
+    def handle_instance_request(self, request, reply):
+        # Requests from later launches in single-instance mode (see pycalc_instance)
+        command = request.get("cmd")
+        if command == "show":
+            if self.isMinimized():
+                self.showNormal()
+            self.show()
+            self.raise_()
+            self.activateWindow()
+        elif command == "eval":
+            # Answered from _poll_eval() once the worker is done
+            self._eval_requests.append((str(request.get("expr", "")), reply))
+            self._next_eval()
+            return
+        elif command == "quit":
+            QTimer.singleShot(0, QApplication.instance().quit)
+        elif command != "ping":
+            reply({"ok": False, "error": f"unknown request {command!r}"})
+            return
+        reply({"ok": True})
 
-    def toggle_sign(self):
-        try:
-            self._currentNumber = -float(self._currentNumber)
-            self.update_display()
-        except Exception:
-            self.handle_calculation_error()
+    def _next_eval(self):
+        if not self._eval_requests or (self.eval_compute is not None and self.eval_compute.busy):
+            return
+        if self.eval_compute is None:
+            self.eval_compute = pycalc_compute.ComputeExecutor(self.compute_time_limit)
+            QApplication.instance().aboutToQuit.connect(self.eval_compute.shutdown)
+        self.eval_compute.submit(('eval', self._eval_requests[0][0], self.engine.max_result_digits))
+        self._eval_timer.start()
 
-    def calculate_square_root(self):
-        try:
-            num = float(self._currentNumber)
-            if num < 0:
-                self._currentNumber = "Error"
-                self.expression_history = f"√({num})"
-            else:
-                result = math.sqrt(num)
-                if result.is_integer() and not self._hasDecimal:
-                    self._currentNumber = int(result)
-                else:
-                    self._currentNumber = result
-                self.expression_history = f"√({num})"
-            self.update_display()
-        except (ValueError, TypeError):
-            self.handle_calculation_error()
+    def _poll_eval(self):
+        outcome = self.eval_compute.poll()
+        if outcome is None:
+            return
+        self._eval_timer.stop()
+        _, reply = self._eval_requests.popleft()
+        status, value = outcome
+        if status == 'ok':
+            reply(value)
+        elif status == 'timeout':
+            reply({"ok": False, "error": f"stopped after {self.eval_compute.time_limit:g}s"})
+        else:
+            reply({"ok": False, "error": value})
+        self._next_eval()
 
-    def calculate_cube_root(self):
-        try:
-            num = float(self._currentNumber)
-            # Cube root, handle negative numbers as real roots
-            if num < 0:
-                result = -(-num) ** (1/3)
-            else:
-                result = num ** (1/3)
-            if isinstance(result, float) and result.is_integer() and not self._hasDecimal:
-                self._currentNumber = int(result)
-            else:
-                self._currentNumber = result
-            self.expression_history = f"∛({num})"
+    def undo(self):
+        if self._compute_job is None and self.engine.undo():
             self.update_display()
-        except Exception:
-            self.handle_calculation_error()
 
-    def calculate_square(self):
-        try:
-            num = float(self._currentNumber)
-            result = num ** 2
-            if result.is_integer() and not self._hasDecimal:
-                self._currentNumber = int(result)
-            else:
-                self._currentNumber = result
-            self.expression_history = f"sqr({num})"
+    def redo(self):
+        if self._compute_job is None and self.engine.redo():
             self.update_display()
-        except (ValueError, TypeError):
-            self.handle_calculation_error()
 
-    def on_button(self, text):
-        if text in '0123456789':
-            self.input_digit(text)
-        elif text == '.':
-            self.input_decimal()
-        elif text in '+-×÷':
-            # If '-' is pressed and we're starting a new number (after operator or at start), treat as negative sign
-            if text == '-' and self._isNewNumberInput:
-                if self._currentNumber == 0 and (not self._currentOperator or self.expression_history.endswith(('+', '-', '×', '÷', '^', '**'))):
-                    self._currentNumber = 0.0
-                    self._isNewNumberInput = False
-                    self._hasDecimal = False
-                    self.toggle_sign()
-                    return
-            op_map = {'+': '+', '-': '-', '×': '*', '÷': '/'}
-            self.input_operator(op_map[text])
-        elif text == '+/-':
-            self.toggle_sign()
-        elif text == 'x²':
-            self.calculate_square()
-        elif text == '∛x':
-            self.calculate_cube_root()
-        elif text == '√x':
-            self.calculate_square_root()
-        elif text == 'xʸ':
-            self.input_operator('**')
-        elif text == '=':
-            self.calculate_result()
-        elif text == 'C':
-            self.reset()
-        elif text == 'CE':
-            self.clear_entry()
-        elif text == '⌫':
-            self.backspace()
+    def toggle_expression_mode(self):
+        if self._compute_job is not None:
+            return
+        enabled = self.engine.expression is None
+        self.engine.set_expression_mode(enabled)
+        self.setWindowTitle("PyCalc - Simple Edition" + (" (Expression)" if enabled else ""))
+        self.update_display()
 
     def keyPressEvent(self, event):
         key = event.key()
-        text = event.text()
-        # Numeric keys
-        if text in '0123456789':
-            self.on_button(text)
-        # Operators
-        elif text == '+':
-            self.on_button('+')
-        elif text == '-':
-            self.on_button('-')
-        elif text == '*':
-            self.on_button('×')
-        elif text == '/':
-            self.on_button('÷')
-        elif text == '.':
-            self.on_button('.')
-        elif text == '^':
-            self.on_button('xʸ')
-        elif text.lower() == 'c':
-            self.on_button('C')
-        elif text == '=' or key == Qt.Key_Enter or key == Qt.Key_Return:
-            self.on_button('=')
-        elif key == Qt.Key_Backspace:
-            self.on_button('⌫')
-        elif key == Qt.Key_Delete:
-            self.on_button('CE')
+        # Ctrl+E switches modes, Ctrl+H shows the history panel, Ctrl+C copies the full result,
+        # Ctrl+V pastes numbers, Ctrl+Z and Ctrl+Y undo and redo
+        if key in self.CONTROL_KEYS and event.modifiers() & Qt.ControlModifier:
+            getattr(self, self.CONTROL_KEYS[key])()
+            return
+        token = self.KEY_TEXT.get(event.text()) or self.KEY_CODES.get(key)
+        if token is not None:
+            self.on_button(token)
+        elif key == Qt.Key_Escape:
+            self.cancel_computation()
         else:
             super().keyPressEvent(event)
 
@@ -538,17 +1037,11 @@ class Calculator(QWidget):
 
             def run(self):
                 try:
-                    response = requests.get(UPDATE_VERSION_URL, timeout=5)
-                    response.raise_for_status()
-                    latest_version = response.text.strip()
-                    if latest_version > self.parent.CURRENT_VERSION:
-                        msg = f"🎉 PyCalc-SE v{latest_version} is OUT NOW!"
-                    elif latest_version == self.parent.CURRENT_VERSION:
-                        msg = "🎉 PyCalc-SE is up to date!"
-                    elif latest_version < self.parent.CURRENT_VERSION:
-                        msg = "⚠️ This is a Dev. Build of PyCalc-SE!"
-                    else:
-                        msg = "🎉 PyCalc-SE is up to date!"
+                    # QSettings objects must not be shared across threads, so open our own.
+                    # requests is only imported when the cache has expired.
+                    settings = QSettings("ChillAstro", "PyCalc-SE")
+                    latest_version = fetch_latest_version(UPDATE_VERSION_URL, settings)
+                    msg = update_message(latest_version, self.parent.CURRENT_VERSION)
                 except Exception:
                     msg = "⚠️ Error : Check your Internet Connection."
                 self.update_message.emit(msg)
@@ -564,11 +1057,107 @@ class Calculator(QWidget):
                 self.history.setText("")
                 self.history.update()
         self.history.setText(msg)
-        self.history.setStyleSheet("font-size: 12px; padding-top: 20px;")
         QTimer.singleShot(4000, clear_message)
 
+def parse_args(argv):
+    import argparse
+    parser = argparse.ArgumentParser(prog="PyCalc-SE")
+    parser.add_argument("--startup-profile", nargs="?", const="-", metavar="FILE",
+                        help="report import time and time to first frame as JSON, then exit")
+    parser.add_argument("--startup-budget", type=float, metavar="MS",
+                        help="with --startup-profile, exit with status 1 if the first frame takes longer")
+    parser.add_argument("--batch", metavar="CSV",
+                        help="evaluate --expr over every row of CSV without opening a window")
+    parser.add_argument("--expr", help="expression for --batch, e.g. \"a*b+c\"")
+    parser.add_argument("--latency-report", nargs="?", const="-", metavar="FILE",
+                        help="time every input from key press to paint and write percentiles as JSON on exit")
+    parser.add_argument("--record", metavar="FILE", help="record every button and key press to FILE")
+    parser.add_argument("--single-instance", action="store_true",
+                        help="reuse the running calculator if there is one, otherwise stay resident after closing")
+    parser.add_argument("--eval", metavar="EXPR", help="print the value of EXPR (from the resident calculator if running)")
+    parser.add_argument("--quit", action="store_true", help="stop the resident calculator")
+    parser.add_argument("--eval-file", metavar="FILE",
+                        help="evaluate every line of FILE on all CPU cores (must come first; see pycalc_parallel.py --help)")
+    parser.add_argument("--cli", action="store_true",
+                        help="run in the terminal instead (must come first; see pycalc_cli.py --help)")
+    parser.add_argument("--replay", metavar="FILE",
+                        help="feed a recording to the window as fast as possible, print the result as JSON and exit")
+    # Unknown arguments are left for Qt (e.g. -platform)
+    args, _ = parser.parse_known_args(argv[1:])
+    return args
+
+def report_startup(calc, args, app_created, window_created):
+    ms = lambda t: round((t - _STARTUP_T0) * 1000, 2)
+    report = {
+        "imports_ms": ms(_IMPORTS_DONE),
+        "qapplication_ms": ms(app_created),
+        "window_ms": ms(window_created),
+        "first_frame_ms": ms(calc.first_frame_time),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if args.startup_budget is not None:
+        report["budget_ms"] = args.startup_budget
+        report["within_budget"] = report["first_frame_ms"] <= args.startup_budget
+    text = json.dumps(report)
+    if args.startup_profile == "-" and sys.stdout is not None:
+        print(text, flush=True)
+    else:
+        path = "startup-profile.json" if args.startup_profile == "-" else args.startup_profile
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    QApplication.instance().exit(0 if report.get("within_budget", True) else 1)
+
+def run_replay(calc, path):
+    import pycalc_replay
+    app = QApplication.instance()
+
+    def finish(action, *args):
+        action(*args)
+        # Large results and long pastes finish in the worker process; later tokens need them
+        while calc._compute_job is not None:
+            app.processEvents()
+            time.sleep(0.001)
+
+    tokens = pycalc_replay.load(path)
+    actions = pycalc_replay.controls(calc)
+    actions[pycalc_replay.PASTE_TOKEN] = lambda text: finish(calc.paste_text, text)
+    seconds = pycalc_replay.replay(tokens, lambda token: finish(calc.on_button, token), actions)
+    app.processEvents()
+    print(json.dumps(pycalc_replay.report(len(tokens), seconds, calc.display.text(), calc.history.text())), flush=True)
+    app.exit(0)
+
 if __name__ == "__main__":
+    # Needed for the compute worker process in frozen builds
+    import multiprocessing
+    multiprocessing.freeze_support()
+    args = parse_args(sys.argv)
+    if args.batch is not None:
+        import pycalc_batch
+        sys.exit(pycalc_batch.main(sys.argv[1:]))
     app = QApplication(sys.argv)
-    calc = Calculator()
+    app_created = time.perf_counter()
+    calc = Calculator(check_updates=args.startup_profile is None and args.replay is None)
+    window_created = time.perf_counter()
+    if args.startup_profile is not None:
+        calc.first_frame_shown.connect(lambda: report_startup(calc, args, app_created, window_created))
+    latency_report = args.latency_report or os.environ.get("PYCALC_LATENCY")
+    if latency_report:
+        # Off by default: without it nothing is wrapped and the module is never imported
+        from pycalc_latency import LatencyProbe
+        latency_probe = LatencyProbe(latency_report)
+        latency_probe.install(calc)
+    if args.record:
+        from pycalc_replay import KeyRecorder
+        recorder = KeyRecorder(args.record)
+        recorder.install(calc)
+        app.aboutToQuit.connect(recorder.close)
+    if args.replay:
+        calc.first_frame_shown.connect(lambda: run_replay(calc, args.replay))
+    if args.single_instance:
+        import pycalc_instance
+        instance_server = pycalc_instance.start_server(calc.handle_instance_request, calc)
+        if instance_server is not None:
+            # Closing only hides the window, so the next launch just shows it again
+            app.setQuitOnLastWindowClosed(False)
     calc.show()
     sys.exit(app.exec())
\ No newline at end of file
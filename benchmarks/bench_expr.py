@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# Parse/evaluate throughput of the expression evaluator on long expressions.
+#   python benchmarks/bench_expr.py [--tokens 5000] [--repeat 20]
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import pycalc_expr
+
+
+def make_expression(tokens, seed=1):
+    rng = random.Random(seed)
+    parts = [str(rng.randint(1, 999))]
+    while len(parts) < tokens:
+        parts.append(rng.choice('+-×÷+-×'))
+        parts.append(str(rng.randint(1, 999)))
+    return ''.join(parts)
+
+
+def timed(fn, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(tokens, repeat):
+    text = make_expression(tokens)
+    count = len(pycalc_expr.tokenize(text))
+
+    def cold():
+        pycalc_expr.clear_cache()
+        pycalc_expr.evaluate(text)
+
+    def whole():
+        # Compile the full text as one AST, bypassing the term cache
+        ast = pycalc_expr.parse(text)
+        pycalc_expr.compile_ast(ast)(None)
+
+    pycalc_expr.evaluate(text)
+    edited = text[:-1] + ('7' if text[-1] != '7' else '8')
+    results = {
+        "tokens": count,
+        "cold_parse_eval_s": timed(cold, repeat),
+        "whole_parse_eval_s": timed(whole, repeat),
+        "warm_eval_s": timed(lambda: pycalc_expr.evaluate(text), repeat),
+        "edit_tail_eval_s": timed(lambda: pycalc_expr.evaluate(edited), repeat),
+    }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Expression evaluator throughput")
+    parser.add_argument("--tokens", type=int, nargs="+", default=[1000, 5000, 20000])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args(argv)
+    for tokens in args.tokens:
+        r = run(tokens, args.repeat)
+        print(f"{r['tokens']:>7} tokens | cold {r['cold_parse_eval_s'] * 1e3:8.2f} ms "
+              f"({r['tokens'] / r['cold_parse_eval_s'] / 1e6:5.2f} Mtok/s) | "
+              f"whole AST {r['whole_parse_eval_s'] * 1e3:8.2f} ms | "
+              f"warm {r['warm_eval_s'] * 1e3:7.2f} ms | "
+              f"edit tail {r['edit_tail_eval_s'] * 1e3:7.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
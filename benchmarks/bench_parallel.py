@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+# Throughput of pycalc_parallel on big-int powers and products, by number of workers.
+#   python benchmarks/bench_parallel.py [--lines 400] [--digits 20000] [--workers 1 2 4 8]
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pycalc_parallel import evaluate_lines, evaluate_line
+from pycalc_compute import DEFAULT_MAX_DIGITS
+
+
+def workload(lines, digits, seed=1):
+    # Powers whose results have about `digits` digits, and products of two such numbers
+    rng = random.Random(seed)
+    exprs = []
+    for i in range(lines):
+        base = rng.randrange(2, 1000)
+        exponent = max(1, int(digits / len(str(base))))
+        if i % 2:
+            exprs.append(f"{base}^{exponent}")
+        else:
+            exprs.append(f"{base}^{exponent // 2}×{rng.randrange(2, 1000)}^{exponent // 2}+{i}")
+    return exprs
+
+
+def main(argv=None):
+    cores = os.cpu_count() or 1
+    default_workers = sorted({1, 2, 4, 8, cores} & set(range(1, cores + 1))) or [1]
+    parser = argparse.ArgumentParser(description="Parallel expression evaluation: scaling with workers")
+    parser.add_argument("--lines", type=int, default=400)
+    parser.add_argument("--digits", type=int, default=20000)
+    parser.add_argument("--workers", type=int, nargs="+", default=default_workers)
+    args = parser.parse_args(argv)
+
+    exprs = workload(args.lines, args.digits)
+    print(f"{args.lines} lines of ~{args.digits}-digit results, {cores} CPU core(s)")
+    # Speedups are against evaluating every line in this process
+    start = time.perf_counter()
+    reference = [evaluate_line(expr, DEFAULT_MAX_DIGITS) for expr in exprs]
+    baseline = time.perf_counter() - start
+    print(f"     inline | {baseline:7.3f} s | {args.lines / baseline:8.1f} lines/s")
+    for workers in args.workers:
+        start = time.perf_counter()
+        results = list(evaluate_lines(exprs, workers, timeout=0))
+        seconds = time.perf_counter() - start
+        if results != reference:
+            raise SystemExit(f"{workers} workers gave different results")
+        print(f"{workers:>3} workers | {seconds:7.3f} s | {args.lines / seconds:8.1f} lines/s | "
+              f"speedup {baseline / seconds:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+# Exact integer kernels for √x, ∛x and x² against the float path they replaced.
+#   python benchmarks/bench_roots.py [--digits 10 300 10000 100000] [--repeat 5]
+import os
+import sys
+import math
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from pycalc_engine import square_root, cube_root, square
+
+
+# The previous implementations: everything through float
+def float_square_root(num):
+    return math.sqrt(float(num))
+
+
+def float_cube_root(num):
+    num = float(num)
+    return -(-num) ** (1/3) if num < 0 else num ** (1/3)
+
+
+def float_square(num):
+    return float(num) ** 2
+
+
+PAIRS = (
+    ("sqrt", float_square_root, square_root),
+    ("cbrt", float_cube_root, cube_root),
+    ("square", float_square, square),
+)
+
+
+def timed(fn, value, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        try:
+            fn(value)
+        except OverflowError:
+            return None
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def exact_share(old, new, power, count, rng):
+    # How many perfect powers each path gives back exactly
+    old_ok = new_ok = 0
+    for _ in range(count):
+        base = rng.randrange(2, 10 ** 6)
+        value = base ** power
+        old_ok += old(value) == base
+        new_ok += new(value) == base
+    return old_ok / count, new_ok / count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Root and square kernels: float path vs exact")
+    parser.add_argument("--digits", type=int, nargs="+", default=[10, 300, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+    rng = random.Random(1)
+    fmt = lambda t: "  overflow" if t is None else f"{t * 1e3:8.3f} ms"
+    for digits in args.digits:
+        value = rng.randrange(10 ** (digits - 1), 10 ** digits)
+        for name, old, new in PAIRS:
+            print(f"{digits:>7} digits {name:>6} | float {fmt(timed(old, value, args.repeat))} | "
+                  f"exact {fmt(timed(new, value, args.repeat))}")
+    for name, power, old, new in (("sqrt", 2, float_square_root, square_root), ("cbrt", 3, float_cube_root, cube_root)):
+        old_share, new_share = exact_share(old, new, power, 10000, rng)
+        print(f"perfect {name} inputs returned exactly | float {old_share:7.2%} | exact {new_share:7.2%}")
+
+
+if __name__ == "__main__":
+    main()
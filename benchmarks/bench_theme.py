@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# Time taken to switch the calculator between the dark and light themes.
+#   python benchmarks/bench_theme.py [--switches 50]
+import os
+import sys
+import time
+import argparse
+import statistics
+import importlib.util
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+
+def load_app():
+    spec = importlib.util.spec_from_file_location("pycalc_app", os.path.join(ROOT, "PyCalc-SE.py"))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Theme switch timing")
+    parser.add_argument("--switches", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    sys.path.insert(0, ROOT)
+    app_module = load_app()
+    app = app_module.QApplication.instance() or app_module.QApplication([])
+    calc = app_module.Calculator(check_updates=False)
+    calc.show()
+    app.processEvents()
+
+    apply_times = []
+    paint_times = []
+    for i in range(args.switches):
+        calc.theme_watcher.theme = 'light' if calc._current_theme == 'dark' else 'dark'
+        start = time.perf_counter()
+        calc.apply_theme()
+        applied = time.perf_counter()
+        calc.repaint()
+        painted = time.perf_counter()
+        apply_times.append(applied - start)
+        paint_times.append(painted - start)
+    calc.close()
+    print(f"{args.switches} switches | apply median {statistics.median(apply_times) * 1e3:.3f} ms "
+          f"max {max(apply_times) * 1e3:.3f} ms | apply + repaint median {statistics.median(paint_times) * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
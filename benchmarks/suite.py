@@ -0,0 +1,326 @@
+#!/usr/bin/env python3
+# Benchmark suite for PyCalc-SE: engine arithmetic, pasted columns, display
+# formatting, themes, startup and memory, run headless (QT_QPA_PLATFORM=offscreen). Results are
+# saved as JSON; compare two result files to catch regressions.
+# The update check is pointed at a local server and settings and history go to
+# a temporary directory, so a run touches neither the network nor the user's
+# own settings.
+#   python benchmarks/suite.py run [--output results.json] [--quick]
+#   python benchmarks/suite.py compare baseline.json results.json [--threshold 10]
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+import tracemalloc
+import importlib.util
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "PyCalc-SE.py")
+sys.path.insert(0, ROOT)
+
+# Unit -> whether lower values are better
+UNITS = {"ms": True, "us": True, "MB": True, "KB": True, "ops/s": False}
+
+
+class _VersionHandler(BaseHTTPRequestHandler):
+    # Answers the update check like the real version file, with an ETag
+    version = "1.5"
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        if self.headers.get("If-None-Match") == '"bench"':
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = self.version.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", '"bench"')
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_update_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _VersionHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/PyC_SE_V.txt"
+
+
+def isolate(workdir, update_url):
+    # Must run before the app module (and so QSettings) is loaded
+    os.environ["QT_QPA_PLATFORM"] = "offscreen"
+    os.environ["XDG_CONFIG_HOME"] = os.path.join(workdir, "config")
+    os.environ["PYCALC_HISTORY_DB"] = os.path.join(workdir, "history.db")
+    os.environ["PYCALC_UPDATE_URL"] = update_url
+    os.environ.pop("PYCALC_LATENCY", None)
+
+
+def load_app():
+    spec = importlib.util.spec_from_file_location("pycalc_app", APP)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def best_of(fn, repeat, number=1):
+    # Fastest of `repeat` runs of fn() called `number` times, per call
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+def pump(app, seconds=0.0, until=None):
+    # Processes events for `seconds`, or until until() is true; False on timeout
+    end = time.perf_counter() + seconds
+    while True:
+        app.processEvents()
+        if until is not None and until():
+            return True
+        if time.perf_counter() >= end:
+            return until is None
+        time.sleep(0.001)
+
+
+class Suite:
+    def __init__(self, quick=False):
+        self.quick = quick
+        self.metrics = {}
+
+    def add(self, name, value, unit):
+        self.metrics[name] = {"value": round(value, 4), "unit": unit}
+        print(f"  {name:<40} {value:>12.3f} {unit}", flush=True)
+
+    def engine(self):
+        # calculate_result() on single operations, and calculate_intermediate_result()
+        # on chains, through the same press() path the window uses
+        from pycalc_engine import CalculatorEngine
+        engine = CalculatorEngine()
+        engine.max_result_digits = 5_000_000
+        rng = random.Random(1)
+        count = 2000 if self.quick else 20000
+        single = [f"{rng.randint(1, 99999)}{rng.choice('+-×÷')}{rng.randint(1, 999)}=" for _ in range(count)]
+        chain = "".join(f"{rng.randint(1, 999)}{rng.choice('+-×')}" for _ in range(count)) + "1="
+        for _ in engine.evaluate_many(single[:100]):
+            pass
+        seconds = best_of(lambda: sum(1 for _ in engine.evaluate_many(single)), 3)
+        self.add("engine.calculate_result", count / seconds, "ops/s")
+
+        def run_chain():
+            engine.reset()
+            engine.feed(chain)
+        seconds = best_of(run_chain, 3)
+        self.add("engine.intermediate_result", count / seconds, "ops/s")
+
+        big = 7 ** 20000
+        def big_product():
+            engine.set_value(big)
+            engine.press('×')
+            engine.input_digits("9" * 2000)
+            engine.press('=')
+        self.add("engine.bigint_product", best_of(big_product, 5, 5) * 1e3, "ms")
+
+    def paste(self):
+        # Summing a pasted column (Ctrl+V) of whole numbers and of amounts, as
+        # the worker process does it
+        from pycalc_paste import summarize
+        rng = random.Random(2)
+        lines = 100_000 if self.quick else 1_000_000
+        columns = {
+            "ints": "\n".join(str(rng.randint(-10 ** 6, 10 ** 6)) for _ in range(lines)),
+            "decimals": "\n".join(f"{rng.randint(-10 ** 8, 10 ** 8) / 100:.2f}" for _ in range(lines)),
+        }
+        for name, text in columns.items():
+            self.add(f"paste.summarize_{name}", best_of(lambda: summarize(text), 3) * 1e3, "ms")
+
+    def display(self, app, calc):
+        # update_display() for numbers of every size; values alternate so each
+        # call really formats and sets new text
+        number = 50 if self.quick else 500
+        huge = 7 ** 300000
+        cases = {
+            "small": (123456789, 987654321),
+            "large": (10 ** 60 + 1, 10 ** 61 + 3),
+            "huge": (huge, huge + 1),
+        }
+        for name, values in cases.items():
+            state = [0]
+
+            def update():
+                state[0] ^= 1
+                calc.engine.set_value(values[state[0]])
+                calc.update_display()
+            self.add(f"display.update_{name}", best_of(update, 5, number) * 1e6, "us")
+        calc.reset()
+        calc.update_display()
+        pump(app)
+
+    def theme(self, app, calc):
+        self.add("theme.detect_os_theme", best_of(calc._detect_os_theme, 5, 5) * 1e3, "ms")
+
+        def switch():
+            calc.theme_watcher.theme = 'light' if calc._current_theme == 'dark' else 'dark'
+            calc.apply_theme()
+        self.add("theme.apply_theme", best_of(switch, 5, 10 if self.quick else 50) * 1e6, "us")
+        pump(app)
+
+    def window(self, app, module):
+        # A second window in a warm process: construction, then first paint
+        timings = []
+        for _ in range(3 if self.quick else 7):
+            start = time.perf_counter()
+            calc = module.Calculator(check_updates=False)
+            built = time.perf_counter()
+            calc.show()
+            pump(app, 2.0, until=lambda: calc.first_frame_time is not None)
+            timings.append((built - start, (calc.first_frame_time or time.perf_counter()) - start))
+            calc.close()
+            calc.deleteLater()
+            pump(app, 0.05)
+        self.add("startup.construct", min(t[0] for t in timings) * 1e3, "ms")
+        self.add("startup.first_paint", min(t[1] for t in timings) * 1e3, "ms")
+
+    def process_startup(self):
+        # A fresh process each time: imports, QApplication, window and first frame
+        runs = []
+        for _ in range(2 if self.quick else 5):
+            output = subprocess.run([sys.executable, APP, "--startup-profile"], capture_output=True,
+                                    text=True, timeout=120, env=os.environ.copy()).stdout
+            runs.append(json.loads(output.strip().splitlines()[-1]))
+        runs.sort(key=lambda run: run["first_frame_ms"])
+        median = runs[len(runs) // 2]
+        self.add("startup.process_imports", median["imports_ms"], "ms")
+        self.add("startup.process_first_frame", median["first_frame_ms"], "ms")
+        if median.get("peak_rss_mb") is not None:
+            self.add("memory.startup_peak_rss", median["peak_rss_mb"], "MB")
+
+    def memory(self, app, calc):
+        # Python heap kept by a window after many results (history, caches, undo)
+        for _ in range(50):
+            calc.engine.feed("12×34=")
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        for i in range(1000):
+            calc.engine.feed(f"C{i}×{i + 7}=")
+            calc.update_display()
+        pump(app, 0.05)
+        grown = tracemalloc.get_traced_memory()[0] - before
+        tracemalloc.stop()
+        self.add("memory.heap_growth_1000_results", grown / 1024, "KB")
+
+    def update_check(self, app, calc):
+        # Full update check against the local server: thread, requests, settings
+        messages = []
+        original = calc.show_update_message
+        calc.show_update_message = lambda msg: messages.append(msg)
+        start = time.perf_counter()
+        calc.check_for_updates()
+        pump(app, 30.0, until=lambda: bool(messages))
+        self.add("update.check", (time.perf_counter() - start) * 1e3, "ms")
+        calc.show_update_message = original
+        if not messages or "Error" in messages[0] or not _VersionHandler.requests:
+            print(f"  update check did not reach the local server: {messages}", file=sys.stderr)
+
+    def run(self):
+        self.engine()
+        self.paste()
+        module = load_app()
+        from PySide6.QtCore import qVersion
+        app = module.QApplication.instance() or module.QApplication([])
+        calc = module.Calculator(check_updates=False)
+        calc.show()
+        pump(app, 2.0, until=lambda: calc.first_frame_time is not None)
+        self.display(app, calc)
+        self.theme(app, calc)
+        self.update_check(app, calc)
+        self.memory(app, calc)
+        calc.close()
+        self.window(app, module)
+        self.process_startup()
+        return {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "qt": qVersion(),
+                "cpus": os.cpu_count(),
+                "quick": self.quick,
+                "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "metrics": self.metrics,
+        }
+
+
+def compare(old, new, threshold):
+    # Prints every metric in both files; returns the names that got worse by
+    # more than threshold percent
+    regressions = []
+    for name in sorted(set(old["metrics"]) & set(new["metrics"])):
+        before = old["metrics"][name]
+        after = new["metrics"][name]
+        unit = after["unit"]
+        if not before["value"]:
+            continue
+        change = (after["value"] - before["value"]) / before["value"] * 100
+        worse = change if UNITS.get(unit, True) else -change
+        flag = "REGRESSION" if worse > threshold else ("improved" if worse < -threshold else "")
+        if flag == "REGRESSION":
+            regressions.append(name)
+        print(f"{name:<40} {before['value']:>12.3f} -> {after['value']:>12.3f} {unit:<6} {change:+7.1f}%  {flag}")
+    for name in sorted(set(new["metrics"]) - set(old["metrics"])):
+        print(f"{name:<40} {'':>12}    {new['metrics'][name]['value']:>12.3f} {new['metrics'][name]['unit']:<6} (new)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PyCalc-SE benchmark suite")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="run every benchmark and save the results as JSON")
+    run_parser.add_argument("--output", "-o", default="benchmark-results.json", metavar="FILE")
+    run_parser.add_argument("--quick", action="store_true", help="fewer iterations, for a smoke test")
+    compare_parser = commands.add_parser("compare", help="compare two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("results")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, metavar="PERCENT",
+                                help="flag metrics that got worse by more than this (default 10)")
+    args = parser.parse_args(argv)
+
+    if args.command == "compare":
+        with open(args.baseline, encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.results, encoding="utf-8") as f:
+            new = json.load(f)
+        regressions = compare(old, new, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:g}%: {', '.join(regressions)}")
+            return 1
+        return 0
+
+    server, url = start_update_server()
+    with tempfile.TemporaryDirectory(prefix="pycalc-bench-") as workdir:
+        isolate(workdir, url)
+        results = Suite(args.quick).run()
+    server.shutdown()
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=1)
+        f.write("\n")
+    print(f"saved {len(results['metrics'])} metrics to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
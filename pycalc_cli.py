@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# Terminal front end for PyCalc-SE.
+# Drives the same CalculatorEngine as the window, so every line behaves exactly
+# like typing its keys on the calculator and pressing Enter ('='). Only the
+# engine is imported (no Qt, no requests), so it starts in a few milliseconds.
+# At a terminal it is a REPL that keeps its state between lines, like the
+# window; with piped input every line is its own calculation and one result is
+# written per line as soon as it is read.
+#   python pycalc_cli.py                     (REPL)
+#   python pycalc_cli.py "12+3" "2^64"       (one result per argument; put -- before "-5*3")
+#   python PyCalc-SE.py --cli ...            (the same, from the calculator itself)
+#   seq 1 1000000 | sed 's/$/x²/' | python pycalc_cli.py
+import re
+import sys
+import argparse
+
+from pycalc_engine import CalculatorEngine, MULTI_CHAR_KEYS
+
+# ASCII spellings of the calculator's keys
+ALIASES = {
+    '*': '×', '/': '÷', '^': 'xʸ', '**': 'xʸ',
+    '√': '√x', 'sqrt': '√x', '∛': '∛x', 'cbrt': '∛x', '²': 'x²', 'sqr': 'x²',
+    '±': '+/-', 'neg': '+/-',
+}
+# Runs of digits stay together; then the longest spellings first, so 'sqrt'
+# wins over 'sqr' and 'CE' over 'C'
+_KEY_RE = re.compile(r'[0-9]+|' + '|'.join(map(re.escape, sorted(set(MULTI_CHAR_KEYS) | set(ALIASES), key=len, reverse=True)))
+                     + r'|\S')
+
+
+def keys(line):
+    aliases = ALIASES
+    return [aliases.get(key, key) for key in _KEY_RE.findall(line)]
+
+
+def make_engine(expression_mode=False, max_digits=None):
+    engine = CalculatorEngine()
+    if max_digits is None:
+        from pycalc_compute import DEFAULT_MAX_DIGITS
+        max_digits = DEFAULT_MAX_DIGITS
+    engine.max_result_digits = max_digits
+    engine.set_expression_mode(expression_mode)
+    return engine
+
+
+def enter(engine, line):
+    # Presses the keys of one line and then Enter, as in the window
+    press = engine.press
+    # Typing a whole number at once is the same as pressing its digits one by one
+    digits = engine.input_digits if engine.expression is None else None
+    for key in keys(line):
+        if key[0] in '0123456789':
+            if digits is not None:
+                digits(key)
+            else:
+                for digit in key:
+                    press(digit)
+        else:
+            press(key)
+    press('=')
+    return engine.full_text()
+
+
+def run_pipe(engine, source, out, line_buffered=False):
+    # One result per input line, each from a fresh calculator; blank lines stay blank
+    reset = engine.reset
+    write = out.write
+    count = 0
+    for line in source:
+        if not line or line.isspace():
+            write("\n")
+        else:
+            reset()
+            write(enter(engine, line) + "\n")
+        count += 1
+        if line_buffered:
+            out.flush()
+    return count
+
+
+def result_line(engine, text):
+    history = engine.expression_history
+    if not history:
+        return text
+    return f"{history} {text}" if history.endswith('=') else f"{history} = {text}"
+
+
+def run_repl(engine):
+    try:
+        import readline  # noqa: F401  (line editing and history where available)
+    except ImportError:
+        pass
+    print("PyCalc-SE  (keys as on the calculator, e.g. 12+3 or 16√x; 'mode' switches to expressions, 'exit' quits)")
+    while True:
+        try:
+            line = input("» " if engine.expression is None else "(expr) » ")
+        except (EOFError, KeyboardInterrupt):
+            print()
+            return 0
+        command = line.strip().lower()
+        if command in ('exit', 'quit'):
+            return 0
+        if command == 'mode':
+            engine.set_expression_mode(engine.expression is None)
+            continue
+        if not command:
+            continue
+        print(result_line(engine, enter(engine, line)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="pycalc_cli",
+                                     description="PyCalc-SE in the terminal. Each line is typed on the calculator, "
+                                                 "followed by Enter.")
+    parser.add_argument("lines", nargs="*", metavar="KEYS", help="calculate each argument and print the results")
+    parser.add_argument("-e", "--expression", action="store_true",
+                        help="expression mode: whole expressions with operator precedence")
+    parser.add_argument("--line-buffered", action="store_true",
+                        help="flush after every result when writing to a pipe")
+    parser.add_argument("--max-digits", type=int, metavar="N", help="give \"Error\" for results longer than N digits")
+    args = parser.parse_args(argv)
+
+    engine = make_engine(args.expression, args.max_digits)
+    if args.lines:
+        run_pipe(engine, args.lines, sys.stdout)
+        return 0
+    if sys.stdin.isatty():
+        return run_repl(engine)
+    try:
+        run_pipe(engine, sys.stdin, sys.stdout, args.line_buffered)
+        sys.stdout.flush()
+    except BrokenPipeError:
+        # The reader went away (e.g. head); stop quietly like other filters
+        import os
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
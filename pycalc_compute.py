@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# Runs expensive calculator jobs (huge powers and products) in a worker process.
+# CPython's big-int arithmetic holds the GIL, so a thread would still freeze the
+# window; a separate process keeps the GUI responsive and can simply be terminated
+# to cancel a job or enforce the time limit.
+import time
+from collections import OrderedDict
+
+# Results estimated above this many digits leave the GUI thread
+OFFLOAD_DIGITS = 20000
+DEFAULT_TIME_LIMIT = 10.0
+DEFAULT_MAX_DIGITS = 5_000_000
+# Results kept by ResultCache: this many, holding at most this much int data
+RESULT_CACHE_ENTRIES = 256
+RESULT_CACHE_BYTES = 32 << 20
+
+
+def run_job(job):
+    # job comes from CalculatorEngine.pending_operation() or function_job(), or
+    # is ('text', int) to write out every digit of a huge result, or
+    # ('paste', text, max_digits) to sum a pasted block of numbers, or
+    # ('eval', text, max_digits) for a reply to a single-instance --eval
+    if job[0] == 'text':
+        from pycalc_engine import int_to_text
+        return int_to_text(job[1])
+    if job[0] == 'paste':
+        from pycalc_paste import summarize
+        return summarize(*job[1:])
+    if job[0] == 'eval':
+        from pycalc_instance import evaluate_request
+        return evaluate_request(*job[1:])
+    if job[0] == 'fn':
+        from pycalc_engine import FUNCTION_KERNELS
+        return FUNCTION_KERNELS[job[1]](job[2])
+    if job[0] == 'expr':
+        from pycalc_expr import evaluate
+        return evaluate(job[1])
+    from pycalc_engine import apply_operator
+    return apply_operator(*job[1:])
+
+
+def _worker(conn):
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            conn.send(('ok', run_job(job)))
+        except Exception as e:
+            conn.send(('error', str(e)))
+
+
+def job_key(job):
+    # Cache key for a job: (operator, previous, current) with their types, as
+    # 2 and 2.0 are equal but results from them can be shown differently
+    if job[0] == 'op':
+        return job + (type(job[2]), type(job[3]))
+    return job
+
+
+class ResultCache:
+    # Recently computed job results by key, least recently used dropped first
+    def __init__(self, max_entries=RESULT_CACHE_ENTRIES, max_bytes=RESULT_CACHE_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._items = OrderedDict()
+
+    def get(self, key):
+        item = self._items.get(key)
+        if item is None:
+            return None
+        self._items.move_to_end(key)
+        return item[0]
+
+    def put(self, key, value):
+        # The key holds the operands, which can be far larger than the result
+        # (a float from big ÷ big), so their ints count too
+        cost = sum(item.bit_length() >> 3 for item in (value,) + key if type(item) is int)
+        if cost > self.max_bytes:
+            return
+        old = self._items.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        self._items[key] = (value, cost)
+        self.bytes += cost
+        while len(self._items) > self.max_entries or self.bytes > self.max_bytes:
+            self.bytes -= self._items.popitem(last=False)[1][1]
+
+    def clear(self):
+        self._items.clear()
+        self.bytes = 0
+
+
+class ComputeExecutor:
+    def __init__(self, time_limit=DEFAULT_TIME_LIMIT, max_digits=DEFAULT_MAX_DIGITS,
+                 offload_digits=OFFLOAD_DIGITS):
+        self.time_limit = time_limit
+        self.max_digits = max_digits
+        self.offload_digits = offload_digits
+        # Imported here so front ends that only need the limits above stay light
+        import multiprocessing
+        self._ctx = multiprocessing.get_context("spawn")
+        self._process = None
+        self._conn = None
+        self._started = None
+        self.job = None
+
+    @property
+    def busy(self):
+        return self.job is not None
+
+    def is_expensive(self, digits):
+        return digits > self.offload_digits
+
+    def _ensure_worker(self):
+        if self._process is None or not self._process.is_alive():
+            self._conn, child = self._ctx.Pipe()
+            self._process = self._ctx.Process(target=_worker, args=(child,), daemon=True,
+                                              name="pycalc-compute")
+            self._process.start()
+            child.close()
+
+    def submit(self, job):
+        self._ensure_worker()
+        self._conn.send(job)
+        self.job = job
+        self._started = time.monotonic()
+
+    def poll(self):
+        # Returns None while running, else ('ok', result), ('error', message) or ('timeout', None)
+        if self.job is None:
+            return None
+        try:
+            if self._conn.poll():
+                status, value = self._conn.recv()
+                self.job = None
+                return status, value
+        except (EOFError, OSError):
+            self.cancel()
+            return 'error', "worker stopped"
+        if self.time_limit and time.monotonic() - self._started > self.time_limit:
+            self.cancel()
+            return 'timeout', None
+        return None
+
+    def elapsed(self):
+        return 0.0 if self._started is None else time.monotonic() - self._started
+
+    def cancel(self):
+        # The only way to stop a running big-int operation is to end the process
+        self.job = None
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join(1)
+            self._process = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def shutdown(self):
+        self.cancel()
@@ -0,0 +1,1004 @@
+#!/usr/bin/env python3
+# Headless calculation engine for PyCalc-SE.
+# Holds the whole calculator state machine with no Qt import, so the GUI,
+# scripts and load tests all share exactly the same arithmetic.
+import math
+import decimal
+from collections import deque
+from functools import partial
+
+# Button tokens longer than one character, longest first for tokenizing
+MULTI_CHAR_KEYS = ('+/-', 'xʸ', 'x²', '∛x', '√x', 'CE')
+
+# int() refuses longer decimal strings, so long inputs are converted in chunks
+_INT_CHUNK_DIGITS = 4000
+# Ints up to this size convert with str() well inside CPython's 4300-digit limit
+_STR_SAFE_BITS = 14000
+# Undo steps kept, and the size of the numbers they may hold between them
+UNDO_DEPTH = 100
+UNDO_MAX_BYTES = 64 << 20
+
+
+def tokenize(keys):
+    # Accepts a list of button tokens or a plain string such as "12+3="
+    if not isinstance(keys, str):
+        return list(keys)
+    tokens = []
+    i = 0
+    length = len(keys)
+    while i < length:
+        for multi in MULTI_CHAR_KEYS:
+            if keys.startswith(multi, i):
+                tokens.append(multi)
+                i += len(multi)
+                break
+        else:
+            if not keys[i].isspace():
+                tokens.append(keys[i])
+            i += 1
+    return tokens
+
+
+def int_from_digits(digits):
+    text = ''.join(digits) or '0'
+    if len(text) <= _INT_CHUNK_DIGITS:
+        return int(text)
+    value = 0
+    for i in range(0, len(text), _INT_CHUNK_DIGITS):
+        chunk = text[i:i + _INT_CHUNK_DIGITS]
+        value = value * 10 ** len(chunk) + int(chunk)
+    return value
+
+
+# --- Numeric kernels shared by the engine and the expression evaluator ---
+def apply_operator(op, a, b):
+    if op == '+':
+        return a + b
+    if op == '-':
+        return a - b
+    if op == '*':
+        return a * b
+    if op == '/':
+        if b == 0:
+            raise ZeroDivisionError("division by zero")
+        return a / b
+    if op == '**':
+        return a ** b
+    raise ValueError(f"unknown operator {op!r}")
+
+
+def int_digits(n):
+    # Decimal digit count of an int, from its bit length (exact to within one)
+    return int(abs(n).bit_length() * 0.30103) + 1
+
+
+def scientific_parts(value, digits):
+    # (sign, leading digits, exponent) of an int, from its top bits only: the
+    # low bits cannot change the first digits, so no full decimal conversion
+    # is needed however long the number is
+    sign = '-' if value < 0 else ''
+    value = abs(value)
+    guard = digits + 10
+    shift = max(value.bit_length() - guard * 4, 0)
+    with decimal.localcontext() as ctx:
+        ctx.prec = guard
+        ctx.Emax = decimal.MAX_EMAX
+        approx = decimal.Decimal(value >> shift) * decimal.Decimal(2) ** shift
+        ctx.prec = digits
+        approx = +approx
+    _, mantissa, exponent = approx.as_tuple()
+    mantissa = ''.join(map(str, mantissa))
+    return sign, mantissa, exponent + len(mantissa) - 1
+
+
+def format_scientific(value, digits):
+    sign, mantissa, exponent = scientific_parts(value, digits)
+    fraction = mantissa[1:].rstrip('0')
+    return f"{sign}{mantissa[0]}{'.' + fraction if fraction else ''}e+{exponent}"
+
+
+def format_number(value):
+    # str() for the display and history; ints too long for str() (and too slow to
+    # convert) are shown in scientific notation from their leading digits instead
+    if type(value) is int and value.bit_length() > _STR_SAFE_BITS:
+        return format_scientific(value, 10)
+    return str(value)
+
+
+def int_to_text(value):
+    # Every digit of an int, for copying. str() is quadratic and refuses more than
+    # 4300 digits; this splits the int in halves and joins them with Decimal
+    # arithmetic (fast multiplication), which stays quick for millions of digits.
+    if value.bit_length() <= _STR_SAFE_BITS:
+        return str(value)
+    powers = {}
+
+    def power_of_two(bits):
+        result = powers.get(bits)
+        if result is None:
+            result = powers[bits] = decimal.Decimal(2) ** bits
+        return result
+
+    def convert(n, bits):
+        if bits <= _STR_SAFE_BITS:
+            return decimal.Decimal(n)
+        half = bits >> 1
+        high = n >> half
+        return convert(n - (high << half), half) + convert(high, bits - half) * power_of_two(half)
+
+    with decimal.localcontext() as ctx:
+        ctx.prec = decimal.MAX_PREC
+        ctx.Emax = decimal.MAX_EMAX
+        ctx.traps[decimal.Inexact] = True
+        text = str(convert(abs(value), abs(value).bit_length()))
+    return '-' + text if value < 0 else text
+
+
+def exact_text(value):
+    # A result as expression text with every digit; a negative one in parentheses
+    # so that ^ and ² after it apply to all of it
+    text = int_to_text(value) if type(value) is int else repr(value)
+    return f"({text})" if value < 0 else text
+
+
+def fit_display(value, width, group=False):
+    # Display text of at most width characters: typed text keeps its tail, numbers
+    # switch to scientific notation (with as many digits as fit) when too long
+    if isinstance(value, str):
+        return value if len(value) <= width else '…' + value[len(value) - width + 1:]
+    if type(value) is int:
+        if int_digits(value) <= width:
+            if group:
+                text = f"{value:,}"
+                if len(text) <= width:
+                    return text
+            text = str(value)
+            if len(text) <= width:
+                return text
+        # Room for the sign, "d.", and "e+" plus the exponent
+        digits = width - (value < 0) - 3 - len(str(int_digits(value)))
+        text = format_scientific(value, max(1, digits))
+        if len(text) > width and digits > 1:
+            # The estimated exponent was one digit short
+            text = format_scientific(value, digits - 1)
+        return text
+    text = str(value)
+    if len(text) <= width or not isinstance(value, float):
+        return text
+    for precision in range(min(17, width), 0, -1):
+        text = format(value, f'.{precision}g')
+        if len(text) <= width:
+            return text
+    return text
+
+
+def estimate_digits(op, a, b):
+    # Rough size of apply_operator(op, a, b) in decimal digits. Only int results
+    # can grow without bound; anything involving floats stays float-sized.
+    if type(a) is not int or type(b) is not int:
+        return 17
+    if op in ('+', '-'):
+        return max(int_digits(a), int_digits(b)) + 1
+    if op == '*':
+        return int_digits(a) + int_digits(b)
+    if op == '**':
+        if b <= 0 or abs(a) <= 1:
+            return 17
+        # Too many digits to count as a float; far past any digit limit anyway
+        if b.bit_length() > 64:
+            return float('inf')
+        return int(b * math.log10(abs(a))) + 1
+    return 17
+
+
+def integer_root(n, k):
+    # Floor of the k-th root of an int n >= 0
+    if k == 2:
+        return math.isqrt(n)
+    if n < 2:
+        return n
+    bits = n.bit_length()
+    if bits <= 2 * k:
+        x = 1 << -(-bits // k)
+    else:
+        # Root of the top bits gives the leading half of the root, from above
+        shift = bits // k // 2
+        x = (integer_root(n >> (k * shift), k) + 1) << shift
+    # Newton's method from above decreases steadily onto the floor
+    while True:
+        y = ((k - 1) * x + n // x ** (k - 1)) // k
+        if y >= x:
+            return x
+        x = y
+
+
+def _rounded_root(n, k):
+    # Nearest float to the k-th root of an int n > 0 that is not a perfect power.
+    # That root is irrational, so with two spare bits and a sticky bit (round to
+    # odd) the single rounding done by float() is the correct one.
+    shift = max(0, -(-(55 * k - n.bit_length()) // k))
+    return math.ldexp(float(integer_root(n << (k * shift), k) | 1), -shift)
+
+
+def _root(num, k):
+    # k-th root of a non-negative number. Ints: exact for perfect powers, otherwise
+    # the correctly rounded float, or the nearest int once the root is past 2**53
+    # (where a float could not be more precise anyway). Floats: correctly rounded.
+    if isinstance(num, float):
+        if not math.isfinite(num) or num == 0:
+            return num
+        if k == 2:
+            return math.sqrt(num)
+        numerator, denominator = num.as_integer_ratio()
+        # num = numerator / 2**a; rescale so the power of two divides by k
+        a = denominator.bit_length() - 1
+        b = -(-a // k) * k
+        n = numerator << (b - a)
+        root = integer_root(n, k)
+        if root ** k == n:
+            return math.ldexp(float(root), -(b // k))
+        return math.ldexp(_rounded_root(n, k), -(b // k))
+    if type(num) is not int:
+        raise TypeError(f"not a number: {num!r}")
+    root = integer_root(num, k)
+    if root ** k == num:
+        return root
+    if root < 1 << 53:
+        return _rounded_root(num, k)
+    return root + 1 if (2 * root + 1) ** k < num << k else root
+
+
+def square_root(num):
+    if num < 0:
+        raise ValueError("square root of a negative number")
+    return _root(num, 2)
+
+
+def cube_root(num):
+    # Negative numbers have real cube roots
+    if num < 0:
+        return -_root(-num, 3)
+    return _root(num, 3)
+
+
+def square(num):
+    # Exact for ints; a float that overflows still raises OverflowError
+    return num * num if type(num) is int else float(num) ** 2
+
+
+# x², √x and ∛x as ('fn', name, number) jobs: key -> name, name -> kernel and history
+FUNCTION_KEYS = {'x²': 'sq', '√x': 'sqrt', '∛x': 'cbrt'}
+FUNCTION_KERNELS = {'sq': square, 'sqrt': square_root, 'cbrt': cube_root}
+FUNCTION_HISTORY = {'sq': "sqr({})", 'sqrt': "√({})", 'cbrt': "∛({})"}
+
+
+def buffer_append(buffer, size, item):
+    # Appends item after the first `size` items of a list that undo steps may
+    # share (see EngineState). Those items never change in place; the rest are
+    # left over from before a ⌫ or an undo and are reused when the same item is
+    # typed again. Returns the list to keep using.
+    if size == len(buffer):
+        buffer.append(item)
+    elif buffer[size] != item:
+        buffer = buffer[:size]
+        buffer.append(item)
+    return buffer
+
+
+class NumberEntry:
+    # Buffer for the number being typed: digits are appended and removed in O(1),
+    # and the text is only turned into a number when an operator or '=' needs it.
+    __slots__ = ('digits', 'size', 'point', 'negative', '_value')
+
+    def __init__(self, negative=False):
+        self.digits = []     # digit characters, without leading zeros; may run past size
+        self.size = 0        # how many of them are the number
+        self.point = None    # how many digits come before the decimal point, if any
+        self.negative = negative
+        self._value = None
+
+    @classmethod
+    def from_text(cls, text):
+        # Returns None unless text is a plain decimal number (so not "1e+16" or "Error")
+        text = text.strip()
+        negative = text.startswith('-')
+        int_part, sep, frac_part = (text[1:] if negative else text).partition('.')
+        if not int_part + frac_part or any(ch not in '0123456789' for ch in int_part + frac_part):
+            return None
+        entry = cls(negative)
+        int_part = int_part.lstrip('0')
+        entry.digits = list(int_part + frac_part)
+        entry.size = len(entry.digits)
+        entry.point = len(int_part) if sep else None
+        return entry
+
+    def append_digit(self, digit):
+        if self.point is None and not self.size and digit == '0':
+            return
+        self.digits = buffer_append(self.digits, self.size, digit)
+        self.size += 1
+        self._value = None
+
+    def append_digits(self, digits):
+        # append_digit() for every character of a string of digits
+        if self.point is None and not self.size:
+            digits = digits.lstrip('0')
+        if self.size != len(self.digits):
+            self.digits = self.digits[:self.size]
+        self.digits.extend(digits)
+        self.size += len(digits)
+        self._value = None
+
+    def append_point(self):
+        if self.point is None:
+            self.point = self.size
+            self._value = None
+
+    def pop(self):
+        # Only the size shrinks, so undo steps sharing the digits stay intact
+        if self.point is not None and self.point == self.size:
+            self.point = None
+        elif self.size:
+            self.size -= 1
+        elif self.point is None:
+            self.negative = False
+        self._value = None
+
+    def current(self):
+        digits = self.digits
+        return digits if self.size == len(digits) else digits[:self.size]
+
+    def toggle_sign(self):
+        self.negative = not self.negative
+        self._value = None
+
+    def text(self):
+        digits = self.current()
+        if self.point is None:
+            body = ''.join(digits) or '0'
+        else:
+            body = (''.join(digits[:self.point]) or '0') + '.' + ''.join(digits[self.point:])
+        return '-' + body if self.negative else body
+
+    def value(self):
+        if self._value is None:
+            if self.point is None:
+                number = int_from_digits(self.current())
+                self._value = -number if self.negative else number
+            else:
+                self._value = float(self.text())
+        return self._value
+
+
+def _same(a, b):
+    # 2 and 2.0, or 0.0 and -0.0, display differently, so they don't count as equal
+    if a is b:
+        return True
+    if type(a) is not type(b) or a != b:
+        return False
+    return type(a) is not float or math.copysign(1, a) == math.copysign(1, b)
+
+
+def _same_buffer(a, b):
+    # (list, size, ...) references to a shared buffer: the same list and size
+    # mean the same items, as the first `size` items never change in place
+    if a is None or b is None:
+        return a is b
+    return a[1:] == b[1:] and (a[0] is b[0] or not a[1])
+
+
+def _buffer_bytes(buffer, older):
+    # Approximate bytes of list slots held by a buffer reference beyond older's
+    if buffer is None:
+        return 0
+    if older is not None and buffer[0] is older[0]:
+        return max(0, buffer[1] - older[1]) * 8
+    return buffer[1] * 8
+
+
+class EngineState:
+    # The engine's fields at one undo step, taken in O(1). Numbers and strings
+    # are immutable and shared with the engine and neighbouring steps rather than
+    # copied; the entry being typed and the expression tokens are kept as
+    # (list, size, ...) references to their buffers, which never change below size.
+    __slots__ = ('number', 'entry', 'previous', 'operator', 'new_input', 'has_decimal', 'result_pending',
+                 'history', 'full_expression', 'current_input', 'tokens', 'cost')
+
+    def same_as(self, other):
+        return (_same(self.number, other.number) and _same_buffer(self.entry, other.entry)
+                and _same(self.previous, other.previous) and self.operator == other.operator
+                and self.new_input == other.new_input and self.has_decimal == other.has_decimal
+                and self.result_pending == other.result_pending and self.history == other.history
+                and _same_buffer(self.tokens, other.tokens))
+
+    def size(self, older):
+        # Approximate bytes of the ints, buffers and history text held here that
+        # older doesn't hold as well
+        values = (self.number,) if self.previous is self.number else (self.number, self.previous)
+        total = 0
+        for value in values:
+            if type(value) is int and (older is None or (value is not older.number and value is not older.previous)):
+                total += value.bit_length() >> 3
+        total += _buffer_bytes(self.entry, older.entry if older is not None else None)
+        total += _buffer_bytes(self.tokens, older.tokens if older is not None else None)
+        if older is None or self.history is not older.history:
+            total += len(self.history)
+        return total
+
+
+class UndoHistory:
+    # Undo and redo over whole engine states, one step per key press. The undo
+    # side is a ring: past `depth` steps, or once the ints it holds pass
+    # max_bytes, the oldest step is dropped, so memory stays bounded however
+    # long the calculator runs. Undo and redo restore a stored step directly.
+    def __init__(self, depth=UNDO_DEPTH, max_bytes=UNDO_MAX_BYTES):
+        self.depth = max(1, depth)
+        self.max_bytes = max_bytes
+        self._undo = deque()
+        self._redo = []
+        # Bytes of int data held by the undo side, counting shared ints once
+        self.bytes = 0
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self.bytes = 0
+
+    def _push(self, state):
+        undo = self._undo
+        state.cost = state.size(undo[-1] if undo else None)
+        undo.append(state)
+        self.bytes += state.cost
+        while len(undo) > self.depth or (self.bytes > self.max_bytes and len(undo) > 1):
+            self.bytes -= undo.popleft().cost
+            # The new oldest step no longer shares with anything older
+            oldest = undo[0]
+            cost = oldest.size(None)
+            self.bytes += cost - oldest.cost
+            oldest.cost = cost
+
+    def record(self, engine):
+        # Called before each change; a key that changed nothing leaves no step
+        undo = self._undo
+        older = undo[-1] if undo else None
+        state = engine.capture()
+        if older is not None and state.same_as(older):
+            return
+        self._redo.clear()
+        self._push(state)
+
+    def undo(self, engine):
+        undo = self._undo
+        current = engine.capture()
+        while undo and undo[-1].same_as(current):
+            self.bytes -= undo.pop().cost
+        if not undo:
+            return False
+        state = undo.pop()
+        self.bytes -= state.cost
+        self._redo.append(current)
+        engine.restore(state)
+        return True
+
+    def redo(self, engine):
+        if not self._redo:
+            return False
+        self._push(engine.capture())
+        engine.restore(self._redo.pop())
+        return True
+
+
+class CalculatorEngine:
+    def __init__(self):
+        # ExpressionInput while expression mode is on, otherwise None
+        self.expression = None
+        # Called with (history text, result text) after every completed '='
+        self.result_listener = None
+        # '=' gives "Error" instead of computing a result longer than this many digits
+        self.max_result_digits = None
+        # UndoHistory once enable_undo() is called; front ends without undo pay nothing
+        self.undo_history = None
+        self._keys = self.key_table()
+        self.reset()
+
+    def key_table(self):
+        # Button token -> bound action, built once so press() is a single dict lookup
+        keys = {digit: partial(self.input_digit, digit) for digit in '0123456789'}
+        keys.update({
+            '.': self.input_decimal,
+            '+': partial(self.input_operator, '+'),
+            '-': self._press_minus,
+            '×': partial(self.input_operator, '*'),
+            '÷': partial(self.input_operator, '/'),
+            '+/-': self.toggle_sign,
+            'x²': self.calculate_square,
+            '∛x': self.calculate_cube_root,
+            '√x': self.calculate_square_root,
+            'xʸ': partial(self.input_operator, '**'),
+            '=': self.calculate_result,
+            'C': self.reset,
+            'CE': self.clear_entry,
+            '⌫': self.backspace,
+        })
+        return keys
+
+    @property
+    def _currentNumber(self):
+        # While a number is being typed its value comes from the entry buffer
+        if self._entry is not None:
+            return self._entry.value()
+        return self._number
+
+    @_currentNumber.setter
+    def _currentNumber(self, value):
+        self._entry = None
+        self._number = value
+
+    def reset(self):
+        self.expression_history = ""
+        self.current_input = "0"
+        self.full_expression = ""
+        self.result_pending = False
+        self._currentNumber = 0.0
+        self._previousNumber = 0.0
+        self._currentOperator = ""
+        self._isNewNumberInput = True
+        self._hasDecimal = False
+        if self.expression is not None:
+            self.expression.clear()
+
+    def set_expression_mode(self, enabled):
+        # Expression mode collects the whole input and evaluates it with precedence on '='
+        if enabled and self.expression is None:
+            from pycalc_expr import ExpressionInput
+            self.expression = ExpressionInput()
+        elif not enabled:
+            self.expression = None
+        self.reset()
+        if self.undo_history is not None:
+            # Steps from the other mode can't be restored into this one
+            self.undo_history.clear()
+
+    def enable_undo(self, depth=UNDO_DEPTH, max_bytes=UNDO_MAX_BYTES):
+        self.undo_history = UndoHistory(depth, max_bytes) if depth > 0 else None
+
+    def record_undo(self):
+        # For changes made outside press(), e.g. a result from the worker process
+        if self.undo_history is not None:
+            self.undo_history.record(self)
+
+    def undo(self):
+        return self.undo_history is not None and self.undo_history.undo(self)
+
+    def redo(self):
+        return self.undo_history is not None and self.undo_history.redo(self)
+
+    def capture(self):
+        # Snapshot of the state; the buffers are referenced, not copied
+        state = EngineState()
+        entry = self._entry
+        if entry is not None:
+            entry = (entry.digits, entry.size, entry.point, entry.negative)
+        expression = self.expression
+        tokens = (expression.tokens, expression.size) if expression is not None else None
+        state.number = self._number
+        state.entry = entry
+        state.previous = self._previousNumber
+        state.operator = self._currentOperator
+        state.new_input = self._isNewNumberInput
+        state.has_decimal = self._hasDecimal
+        state.result_pending = self.result_pending
+        state.history = self.expression_history
+        state.full_expression = self.full_expression
+        state.current_input = self.current_input
+        state.tokens = tokens
+        state.cost = 0
+        return state
+
+    def restore(self, state):
+        self._number = state.number
+        if state.entry is None:
+            self._entry = None
+        else:
+            digits, size, point, negative = state.entry
+            self._entry = NumberEntry(negative)
+            self._entry.digits = digits
+            self._entry.size = size
+            self._entry.point = point
+        self._previousNumber = state.previous
+        self._currentOperator = state.operator
+        self._isNewNumberInput = state.new_input
+        self._hasDecimal = state.has_decimal
+        self.result_pending = state.result_pending
+        self.expression_history = state.history
+        self.full_expression = state.full_expression
+        self.current_input = state.current_input
+        if self.expression is not None:
+            self.expression.tokens, self.expression.size = state.tokens or ([], 0)
+
+    def set_value(self, value, history=""):
+        # Shows value as a finished result that the next operator can continue from.
+        # With an operator pending ("5 +") it is that operator's second operand instead.
+        self.record_undo()
+        expression = self.expression
+        if expression is not None:
+            tokens = expression.current()
+            if not self.result_pending and tokens and tokens[-1] in '+-×÷^(':
+                expression.load(tokens + list(exact_text(value)))
+                return
+        elif self._currentOperator:
+            # "8 ×" straight after a result still counts as a result until a number comes
+            self._currentNumber = value
+            self._isNewNumberInput = False
+            self._hasDecimal = False
+            self.result_pending = False
+            return
+        self._currentNumber = value
+        self.expression_history = history
+        self._previousNumber = value
+        self._currentOperator = ""
+        self._isNewNumberInput = True
+        self._hasDecimal = False
+        self.result_pending = True
+        if self.expression is not None:
+            self.expression.clear()
+
+    def load_text(self, text, history=""):
+        # Like set_value() for a number written as text, such as a result picked
+        # from the history panel: it too fills in a pending operator's operand.
+        # False if the text isn't a number.
+        entry = NumberEntry.from_text(text)
+        try:
+            value = entry.value() if entry is not None else float(text)
+        except ValueError:
+            return False
+        if isinstance(value, float) and not math.isfinite(value):
+            return False
+        self.set_value(value, history)
+        return True
+
+    def _notify_result(self):
+        if self.result_listener is not None:
+            self.result_listener(self.expression_history, self.display_text())
+
+    def display_source(self):
+        # What the display shows: text while typing, otherwise the number itself,
+        # so a front end can fit it to its own width
+        if self.expression is not None and not self.expression.is_empty():
+            return self.expression.text()
+        if self._entry is not None:
+            return self._entry.text()
+        value = self._currentNumber
+        if isinstance(value, float) and value.is_integer() and not self._hasDecimal:
+            return int(value)
+        return value
+
+    def display_text(self):
+        source = self.display_source()
+        return source if isinstance(source, str) else format_number(source)
+
+    def full_text(self):
+        # display_text() with every digit of a huge result, e.g. for copying
+        source = self.display_source()
+        return int_to_text(source) if type(source) is int else str(source)
+
+    def clear_entry(self):
+        self.current_input = "0"
+        self._currentNumber = 0.0
+        self._isNewNumberInput = True
+        self._hasDecimal = False
+
+    def _editable_entry(self):
+        # Entry to keep typing into; a computed result is picked up from its display text
+        if self._entry is not None:
+            return self._entry
+        try:
+            entry = NumberEntry.from_text(self.display_text())
+        except ValueError:
+            entry = None
+        return entry if entry is not None else NumberEntry()
+
+    def _start_entry(self):
+        if self.result_pending:
+            self.expression_history = ""
+            self.full_expression = ""
+            self.result_pending = False
+            return NumberEntry()
+        if self._isNewNumberInput:
+            return NumberEntry()
+        return self._editable_entry()
+
+    def backspace(self):
+        if self.result_pending:
+            return
+        entry = self._editable_entry()
+        entry.pop()
+        self._entry = entry
+        self._hasDecimal = entry.point is not None
+        self._isNewNumberInput = False
+
+    def input_digit(self, digit):
+        entry = self._start_entry()
+        entry.append_digit(digit)
+        self._entry = entry
+        self._isNewNumberInput = False
+        self._hasDecimal = entry.point is not None
+
+    def input_digits(self, digits):
+        # Same as input_digit() for each digit of a run in turn, for front ends that type whole numbers
+        entry = self._start_entry()
+        entry.append_digits(digits)
+        self._entry = entry
+        self._isNewNumberInput = False
+        self._hasDecimal = entry.point is not None
+
+    def input_decimal(self):
+        entry = self._start_entry()
+        entry.append_point()
+        self._entry = entry
+        self._isNewNumberInput = False
+        self._hasDecimal = True
+
+    def input_operator(self, op):
+        if not self._currentNumber and op != '-':
+            return
+        if not self._isNewNumberInput:
+            if self._currentOperator:
+                self.calculate_intermediate_result()
+            else:
+                self._previousNumber = self._currentNumber
+        visual_op = self.get_visual_operator(op)
+        self.expression_history = f"{format_number(self._previousNumber)} {visual_op} "
+        self._currentOperator = op
+        self._isNewNumberInput = True
+        self._hasDecimal = False
+
+    def _set_division_error(self):
+        self._currentNumber = "Error"
+        self.expression_history = ""
+        self._previousNumber = 0
+        self._currentOperator = ""
+        self._isNewNumberInput = True
+        self.result_pending = False
+        self._hasDecimal = False
+
+    def calculate_intermediate_result(self):
+        if self._currentOperator:
+            try:
+                if self._currentOperator == '+':
+                    result = self._previousNumber + self._currentNumber
+                elif self._currentOperator == '-':
+                    result = self._previousNumber - self._currentNumber
+                elif self._currentOperator == '*':
+                    result = self._previousNumber * self._currentNumber
+                elif self._currentOperator == '/':
+                    if self._currentNumber == 0:
+                        self._set_division_error()
+                        return
+                    result = self._previousNumber / self._currentNumber
+                if isinstance(result, float) and result.is_integer() and not self._hasDecimal:
+                    self._currentNumber = int(result)
+                else:
+                    self._currentNumber = result
+                self._previousNumber = self._currentNumber
+                self._isNewNumberInput = True
+                self._hasDecimal = False
+            except Exception:
+                self.handle_calculation_error()
+
+    def calculate_result(self):
+        job = self.pending_operation()
+        if job is None or job[0] != 'op':
+            return
+        try:
+            if self._too_large(job):
+                raise OverflowError("result too large")
+            result = apply_operator(*job[1:])
+        except ZeroDivisionError:
+            self._set_division_error()
+            return
+        except Exception:
+            self.handle_calculation_error()
+            return
+        self.complete_result(job, result)
+
+    def handle_calculation_error(self):
+        self._currentNumber = "Error"
+        self.expression_history = ""
+        self._previousNumber = 0
+        self._currentOperator = ""
+        self._isNewNumberInput = True
+        self.result_pending = False
+        self._hasDecimal = False
+
+    def get_visual_operator(self, op):
+        return op.replace('**', '^').replace('*', '×').replace('/', '÷')
+
+    def toggle_sign(self):
+        if self._entry is not None:
+            self._entry.toggle_sign()
+            return
+        try:
+            self._currentNumber = -float(self._currentNumber)
+        except Exception:
+            self.handle_calculation_error()
+
+    def _function_operand(self):
+        # The number x², √x and ∛x apply to; ints stay ints so results can be exact
+        num = self._currentNumber
+        if type(num) not in (int, float):
+            raise TypeError(f"not a number: {num!r}")
+        return num
+
+    def _set_function_result(self, result, history):
+        if isinstance(result, float) and result.is_integer() and not self._hasDecimal:
+            result = int(result)
+        self._currentNumber = result
+        self.expression_history = history
+
+    def calculate_square_root(self):
+        try:
+            num = self._function_operand()
+            history = FUNCTION_HISTORY['sqrt'].format(format_number(num))
+            if num < 0:
+                self._currentNumber = "Error"
+                self.expression_history = history
+            else:
+                self._set_function_result(square_root(num), history)
+        except (ValueError, TypeError, OverflowError):
+            self.handle_calculation_error()
+
+    def calculate_cube_root(self):
+        try:
+            num = self._function_operand()
+            self._set_function_result(cube_root(num), FUNCTION_HISTORY['cbrt'].format(format_number(num)))
+        except Exception:
+            self.handle_calculation_error()
+
+    def calculate_square(self):
+        try:
+            num = self._function_operand()
+            if type(num) is int and self.max_result_digits is not None and 2 * int_digits(num) > self.max_result_digits:
+                raise OverflowError("result too large")
+            self._set_function_result(square(num), FUNCTION_HISTORY['sq'].format(format_number(num)))
+        except (ValueError, TypeError, OverflowError):
+            self.handle_calculation_error()
+
+    def pending_operation(self):
+        # The work '=' would do right now, as a picklable job, or None:
+        # ('op', operator, first, second) or ('expr', expression text)
+        if self.expression is not None:
+            if self.expression.is_empty():
+                return None
+            return ('expr', self.expression.text())
+        if self.result_pending or not self._currentOperator:
+            return None
+        return ('op', self._currentOperator, self._previousNumber, self._currentNumber)
+
+    def function_job(self, key):
+        # The work x², √x or ∛x would do right now, as ('fn', name, number), or
+        # None when it is cheap anyway: only ints can be large
+        name = FUNCTION_KEYS.get(key)
+        if name is None or self.expression is not None:
+            return None
+        num = self._currentNumber
+        if type(num) is not int or (name == 'sqrt' and num < 0):
+            return None
+        return ('fn', name, num)
+
+    def job_digits(self, job):
+        if job[0] == 'expr':
+            from pycalc_expr import estimate_digits as estimate_expression_digits
+            return estimate_expression_digits(job[1])
+        if job[0] == 'fn':
+            # Roots take time in proportion to their operand, not their result
+            digits = int_digits(job[2])
+            return 2 * digits if job[1] == 'sq' else digits
+        return estimate_digits(*job[1:])
+
+    def result_value(self, job, result):
+        # The number complete_result() would show for this job's result
+        if job[0] in ('op', 'fn') and isinstance(result, float) and result.is_integer() and not self._hasDecimal:
+            return int(result)
+        return result
+
+    def complete_result(self, job, result):
+        # Commits the result of a pending_operation() or function_job() job,
+        # however it was computed
+        if job[0] == 'fn':
+            _, name, num = job
+            self._set_function_result(result, FUNCTION_HISTORY[name].format(format_number(num)))
+            return
+        if job[0] == 'expr':
+            if self.expression is not None:
+                self.expression.clear()
+            self._currentNumber = result
+            self.expression_history = f"{job[1]} ="
+        else:
+            _, op, first, second_number = job
+            self._currentNumber = self.result_value(job, result)
+            self.expression_history = (f"{format_number(first)} {self.get_visual_operator(op)} "
+                                       f"{format_number(second_number)} =")
+            self._isNewNumberInput = True
+            self._currentOperator = ""
+            self._previousNumber = self._currentNumber
+            self._hasDecimal = False
+        self.result_pending = True
+        self._notify_result()
+
+    def fail_job(self, job, history=""):
+        # A job that raised, was cancelled or ran out of time ends as "Error"
+        if job[0] == 'expr' and self.expression is not None:
+            self.expression.clear()
+        self.handle_calculation_error()
+        self.expression_history = history
+
+    def _too_large(self, job):
+        return self.max_result_digits is not None and self.job_digits(job) > self.max_result_digits
+
+    def _press_expression(self, text):
+        expression = self.expression
+        if text == '=':
+            job = self.pending_operation()
+            if job is None:
+                return
+            from pycalc_expr import evaluate
+            try:
+                if self._too_large(job):
+                    raise OverflowError("result too large")
+                result = evaluate(job[1])
+            except Exception:
+                self.fail_job(job)
+                return
+            self.complete_result(job, result)
+        elif text == 'C':
+            self.reset()
+        else:
+            if self.result_pending:
+                # Operators continue from the last result, anything else starts over
+                self.result_pending = False
+                self.expression_history = ""
+                if text in ('+', '-', '×', '÷', 'xʸ', 'x²') and isinstance(self._currentNumber, (int, float)):
+                    # The exact value, not the display's rounded scientific notation
+                    expression.load(exact_text(self._currentNumber))
+            expression.press(text)
+
+    def _press_minus(self):
+        # If '-' is pressed and we're starting a new number (after operator or at start), treat as negative sign
+        if self._isNewNumberInput:
+            if self._currentNumber == 0 and (not self._currentOperator or self.expression_history.endswith(('+', '-', '×', '÷', '^', '**'))):
+                self._entry = NumberEntry(negative=True)
+                self._isNewNumberInput = False
+                self._hasDecimal = False
+                return
+        self.input_operator('-')
+
+    def press(self, text):
+        if self.undo_history is not None:
+            self.undo_history.record(self)
+        if self.expression is not None:
+            self._press_expression(text)
+            return
+        action = self._keys.get(text)
+        if action is not None:
+            action()
+
+    # --- Batch API ---
+    def feed(self, keys):
+        # Press every token in order and return the resulting display text
+        press = self.press
+        for token in tokenize(keys):
+            press(token)
+        return self.display_text()
+
+    def evaluate_many(self, sequences):
+        # Yields the final display text of each key sequence, starting fresh every time
+        for keys in sequences:
+            self.reset()
+            yield self.feed(keys)
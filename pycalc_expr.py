@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+# Full-expression evaluation for PyCalc-SE.
+# Expressions use the calculator's own operators (+ - × ÷ ^ √ ∛ ²) with normal
+# precedence. Text is parsed into a small tuple AST and compiled into closures;
+# compiled top-level terms are kept in a bounded LRU cache keyed by their
+# normalized text, so editing one end of a long expression only re-parses the
+# terms that actually changed.
+import re
+import math
+import operator
+from functools import lru_cache
+
+from pycalc_engine import int_from_digits, int_digits, square_root, cube_root, square, buffer_append
+
+EXPR_CACHE_SIZE = 4096
+# Values of cached expressions are kept with them only up to this size (4 KB),
+# so the cache cannot pin megabytes of big ints per entry
+VALUE_CACHE_BITS = 1 << 15
+
+_TOKEN_RE = re.compile(r"""
+    (?P<num>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_][A-Za-z_0-9]*)
+  | (?P<op>[-+×÷^√∛²()])
+  | (?P<bad>\S)
+""", re.VERBOSE)
+
+# Characters after which '+' or '-' is a binary operator rather than a sign
+_OPERAND_END = frozenset('0123456789.)²' + 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_')
+# Binary '+'/'-' in text without parentheses, skipping exponents such as 1e+16
+_FLAT_SPLIT_RE = re.compile(r"(?<=[0-9.)²A-Za-z_])(?<![0-9.][eE])([+-])")
+
+FUNCTIONS = {'sqrt': 'sqrt', 'cbrt': 'cbrt', 'sqr': 'sq'}
+
+
+def _power(base, exponent):
+    result = base ** exponent
+    if isinstance(result, complex):
+        raise ValueError("complex result")
+    return result
+
+
+# Operation table used by compile_ast(); other front ends can pass their own
+SCALAR_OPS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '^': _power,
+    'neg': operator.neg,
+    'sqrt': square_root,
+    'cbrt': cube_root,
+    'sq': square,
+}
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+def normalize(text):
+    # ASCII spellings map onto the calculator's own symbols
+    text = ''.join(text.split())
+    return text.replace('**', '^').replace('*', '×').replace('/', '÷').replace('−', '-')
+
+
+def parse_number(literal):
+    if '.' in literal or 'e' in literal or 'E' in literal:
+        return float(literal)
+    return int_from_digits(literal)
+
+
+# --- Parser: text -> tuple AST ---
+# ('num', value) ('var', name) ('neg'|'sqrt'|'cbrt'|'sq', operand)
+# ('pow', base, exponent) ('chain', first, ((op, operand), ...)) for left-assoc + - × ÷
+
+def tokenize(text):
+    tokens = []
+    for match in _TOKEN_RE.finditer(text):
+        kind = match.lastgroup
+        if kind == 'bad':
+            raise ExpressionError(f"unexpected character {match.group()!r}")
+        tokens.append((kind, match.group()))
+    return tokens
+
+
+class _Parser:
+    __slots__ = ('tokens', 'pos')
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos][1]
+        return None
+
+    def take(self):
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def expect(self, value):
+        if self.peek() != value:
+            raise ExpressionError(f"expected {value!r}")
+        self.pos += 1
+
+    def parse(self):
+        if not self.tokens:
+            raise ExpressionError("empty expression")
+        node = self.expr()
+        if self.pos != len(self.tokens):
+            raise ExpressionError(f"unexpected {self.peek()!r}")
+        return node
+
+    def _chain(self, operand, symbols):
+        first = operand()
+        rest = []
+        while self.peek() in symbols:
+            rest.append((symbols[self.take()[1]], operand()))
+        return ('chain', first, tuple(rest)) if rest else first
+
+    def expr(self):
+        return self._chain(self.term, {'+': '+', '-': '-'})
+
+    def term(self):
+        return self._chain(self.unary, {'×': '*', '÷': '/'})
+
+    def unary(self):
+        token = self.peek()
+        if token == '-':
+            self.pos += 1
+            return ('neg', self.unary())
+        if token == '+':
+            self.pos += 1
+            return self.unary()
+        if token == '√':
+            self.pos += 1
+            return ('sqrt', self.unary())
+        if token == '∛':
+            self.pos += 1
+            return ('cbrt', self.unary())
+        return self.power()
+
+    def power(self):
+        base = self.postfix()
+        if self.peek() == '^':
+            self.pos += 1
+            # Right-associative, and the exponent may carry its own sign
+            return ('pow', base, self.unary())
+        return base
+
+    def postfix(self):
+        node = self.primary()
+        while self.peek() == '²':
+            self.pos += 1
+            node = ('sq', node)
+        return node
+
+    def primary(self):
+        if self.pos >= len(self.tokens):
+            raise ExpressionError("unexpected end of expression")
+        kind, value = self.take()
+        if kind == 'num':
+            return ('num', parse_number(value))
+        if kind == 'name':
+            if value in FUNCTIONS and self.peek() == '(':
+                self.pos += 1
+                node = self.expr()
+                self.expect(')')
+                return (FUNCTIONS[value], node)
+            return ('var', value)
+        if value == '(':
+            node = self.expr()
+            self.expect(')')
+            return node
+        raise ExpressionError(f"unexpected {value!r}")
+
+
+def parse(text):
+    return _Parser(tokenize(normalize(text))).parse()
+
+
+# --- Compiler: AST -> closure taking a variable mapping ---
+
+def compile_ast(node, ops=SCALAR_OPS):
+    kind = node[0]
+    if kind == 'num':
+        value = node[1]
+        return lambda env: value
+    if kind == 'var':
+        name = node[1]
+        def load(env):
+            try:
+                return env[name]
+            except (KeyError, TypeError):
+                raise ExpressionError(f"unknown name {name!r}") from None
+        return load
+    if kind == 'chain':
+        first = compile_ast(node[1], ops)
+        rest = tuple((ops[op], compile_ast(operand, ops)) for op, operand in node[2])
+        # Loop instead of nesting, so long chains don't hit the recursion limit
+        def chain(env):
+            value = first(env)
+            for apply, operand in rest:
+                value = apply(value, operand(env))
+            return value
+        return chain
+    if kind == 'pow':
+        base = compile_ast(node[1], ops)
+        exponent = compile_ast(node[2], ops)
+        apply = ops['^']
+        return lambda env: apply(base(env), exponent(env))
+    operand = compile_ast(node[1], ops)
+    apply = ops[kind]
+    return lambda env: apply(operand(env))
+
+
+class CompiledExpression:
+    __slots__ = ('text', 'ast', 'fn', '_value')
+
+    def __init__(self, text, ast, fn):
+        self.text = text
+        self.ast = ast
+        self.fn = fn
+        self._value = None
+
+    def __call__(self, env=None):
+        if env is not None:
+            return self.fn(env)
+        # Without variables the value never changes, so keep it with the compiled form
+        value = self._value
+        if value is None:
+            value = self.fn(None)
+            if type(value) is not int or value.bit_length() <= VALUE_CACHE_BITS:
+                self._value = value
+        return value
+
+
+@lru_cache(maxsize=EXPR_CACHE_SIZE)
+def _compile_normalized(text):
+    ast = _Parser(tokenize(text)).parse()
+    return CompiledExpression(text, ast, compile_ast(ast))
+
+
+def compile_expression(text):
+    return _compile_normalized(normalize(text))
+
+
+def split_terms(text):
+    # Splits normalized text at top-level binary '+'/'-': "2×3-4+5" -> [('+', '2×3'), ('-', '4'), ('+', '5')]
+    if '(' not in text:
+        parts = _FLAT_SPLIT_RE.split(text)
+        return [('+', parts[0])] + list(zip(parts[1::2], parts[2::2]))
+    terms = []
+    depth = 0
+    start = 0
+    sign = '+'
+    previous = ''
+    for i, ch in enumerate(text):
+        if ch == '(':
+            depth += 1
+        elif ch == ')':
+            depth -= 1
+        elif ch in '+-' and depth == 0 and previous in _OPERAND_END and previous:
+            # A '+'/'-' right after an exponent marker is part of a number like 1e+16
+            if not (previous in 'eE' and i >= 2 and text[i - 2] in '0123456789.'):
+                terms.append((sign, text[start:i]))
+                sign = ch
+                start = i + 1
+        previous = ch
+    terms.append((sign, text[start:]))
+    return terms
+
+
+def finalize(value):
+    # Same display rule as the calculator: whole floats collapse to int
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def evaluate(text, env=None):
+    # Evaluates text with the calculator's precedence. Each top-level term is
+    # compiled (and cached) on its own, then the terms are folded left to right,
+    # which gives exactly the result of compiling the whole expression at once.
+    text = normalize(text)
+    value = None
+    compiled = _compile_normalized
+    for sign, term in split_terms(text):
+        if not term:
+            raise ExpressionError("missing operand")
+        term_value = compiled(term)(env)
+        if value is None:
+            value = term_value
+        elif sign == '+':
+            value = value + term_value
+        else:
+            value = value - term_value
+    return finalize(value)
+
+
+# Exponents are only evaluated for estimating when they are this small
+_ESTIMATE_EXPONENT_DIGITS = 30
+
+
+def _estimate(node):
+    kind = node[0]
+    if kind == 'num':
+        return int_digits(node[1]) if type(node[1]) is int else 17
+    if kind == 'var':
+        return 17
+    if kind == 'chain':
+        digits = _estimate(node[1])
+        for op, operand in node[2]:
+            operand_digits = _estimate(operand)
+            if op == '*':
+                digits += operand_digits
+            elif op == '/':
+                digits = 17
+            else:
+                digits = max(digits, operand_digits) + 1
+        return digits
+    if kind == 'pow':
+        base_digits = _estimate(node[1])
+        if _estimate(node[2]) > _ESTIMATE_EXPONENT_DIGITS:
+            return float('inf')
+        try:
+            exponent = compile_ast(node[2])(None)
+        except Exception:
+            return 17
+        if type(exponent) is not int or exponent <= 0:
+            return 17
+        if node[1][0] == 'num':
+            base = node[1][1]
+            if type(base) is not int:
+                return 17
+            return int(exponent * math.log10(abs(base))) + 1 if abs(base) > 1 else 1
+        return base_digits * exponent
+    if kind == 'sq':
+        return 2 * _estimate(node[1])
+    return _estimate(node[1])
+
+
+def estimate_digits(text):
+    # Rough size of evaluate(text) in decimal digits, without evaluating it;
+    # text that does not parse is cheap to reject, so it estimates as 0
+    try:
+        ast = compile_expression(text).ast
+    except Exception:
+        return 0
+    return _estimate(ast)
+
+
+def clear_cache():
+    _compile_normalized.cache_clear()
+
+
+def cache_info():
+    return _compile_normalized.cache_info()
+
+
+class ExpressionInput:
+    # Expression being typed in expression mode, kept as one token per key press.
+    # The first `size` tokens are the expression; like NumberEntry.digits the
+    # list is shared with undo steps, so they are never changed in place.
+    KEY_TOKENS = {
+        '+': '+', '-': '-', '×': '×', '÷': '÷', 'xʸ': '^',
+        'x²': '²', '√x': '√', '∛x': '∛', '(': '(', ')': ')', '.': '.',
+    }
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.tokens = []
+        self.size = 0
+
+    def load(self, tokens):
+        self.tokens = list(tokens)
+        self.size = len(self.tokens)
+
+    def is_empty(self):
+        return not self.size
+
+    def current(self):
+        tokens = self.tokens
+        return tokens if self.size == len(tokens) else tokens[:self.size]
+
+    def text(self):
+        return ''.join(self.current())
+
+    def _append(self, token):
+        self.tokens = buffer_append(self.tokens, self.size, token)
+        self.size += 1
+
+    def press(self, key):
+        if key in '0123456789' and len(key) == 1:
+            self._append(key)
+        elif key in self.KEY_TOKENS:
+            self._append(self.KEY_TOKENS[key])
+        elif key == '+/-':
+            self.toggle_sign()
+        elif key == '⌫':
+            if self.size:
+                self.size -= 1
+        elif key == 'CE':
+            self.clear()
+
+    def toggle_sign(self):
+        # Adds or removes a unary minus in front of the last number
+        tokens = self.tokens
+        i = self.size
+        while i > 0 and tokens[i - 1] in '0123456789.':
+            i -= 1
+        before = tokens[i - 2] if i >= 2 else ''
+        if i >= 1 and tokens[i - 1] == '-' and before not in _OPERAND_END:
+            self.tokens = tokens[:i - 1] + tokens[i:self.size]
+        else:
+            self.tokens = tokens[:i] + ['-'] + tokens[i:self.size]
+        self.size = len(self.tokens)
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# Persistent calculation history for PyCalc-SE.
+# Every completed calculation goes into a bounded in-memory ring and onto a queue;
+# a background thread writes the queue to SQLite in batches, so the GUI thread never
+# waits on disk. Reads are paged by id (newest first), so even a history with
+# millions of rows opens instantly. A search has to scan the table, so the GUI asks
+# for pages with page_async, which reads on a thread of its own.
+import time
+import queue
+import sqlite3
+import threading
+from collections import deque
+
+RING_SIZE = 1000
+WRITE_BATCH = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS history (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    expression TEXT NOT NULL,
+    result TEXT NOT NULL
+)
+"""
+
+
+class HistoryEntry:
+    __slots__ = ('id', 'ts', 'expression', 'result')
+
+    def __init__(self, id, ts, expression, result):
+        self.id = id
+        self.ts = ts
+        self.expression = expression
+        self.result = result
+
+    def matches(self, needle):
+        return needle in self.expression or needle in self.result
+
+    def text(self):
+        return f"{self.expression} {self.result}"
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(_SCHEMA)
+    conn.commit()
+    return conn
+
+
+class HistoryStore:
+    def __init__(self, path, ring_size=RING_SIZE):
+        self.path = path
+        # Reads happen on the caller's thread, writes only on the writer thread
+        self._reader = _connect(path)
+        self._next_id = (self._reader.execute("SELECT MAX(id) FROM history").fetchone()[0] or 0) + 1
+        self.ring = deque(maxlen=ring_size)
+        self._pending = queue.Queue()
+        self._lock = threading.Lock()
+        # Ids are handed out in order and written in order, so one number says what is on disk
+        self._written_upto = self._next_id - 1
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="history-writer", daemon=True)
+        self._writer.start()
+        # page_async requests, tagged with the generation they were made in
+        self._reads = queue.Queue()
+        self._read_generation = 0
+        self._searcher = None
+        self._search_conn = None
+
+    def append(self, expression, result):
+        # Cheap and non-blocking: safe to call from the GUI thread on every '='
+        with self._lock:
+            entry = HistoryEntry(self._next_id, time.time(), expression, result)
+            self._next_id += 1
+            self.ring.append(entry)
+            self._pending.put(entry)
+        return entry
+
+    def _write_loop(self):
+        conn = _connect(self.path)
+        stop = False
+        while not stop:
+            batch = [self._pending.get()]
+            while len(batch) < WRITE_BATCH:
+                try:
+                    batch.append(self._pending.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            rows = [(e.id, e.ts, e.expression, e.result) for e in batch if e is not None]
+            if rows:
+                conn.executemany("INSERT OR REPLACE INTO history VALUES (?, ?, ?, ?)", rows)
+                conn.commit()
+                self._written_upto = rows[-1][0]
+            for _ in batch:
+                self._pending.task_done()
+        conn.close()
+
+    def page_async(self, before, limit, needle, done):
+        # page() on the search thread; done(entries) is called on that thread.
+        # Requests made before the last cancel_reads() are dropped unanswered.
+        with self._lock:
+            before = self._next_id if before is None else before
+            if self._searcher is None:
+                self._searcher = threading.Thread(target=self._search_loop, name="history-search", daemon=True)
+                self._searcher.start()
+        self._reads.put((self._read_generation, before, limit, needle, done))
+
+    def cancel_reads(self):
+        # Called when the filter changes: a search still scanning for the old needle stops at once
+        self._read_generation += 1
+        conn = self._search_conn
+        if conn is not None:
+            conn.interrupt()
+
+    def _search_loop(self):
+        conn = self._search_conn = _connect(self.path)
+        while True:
+            request = self._reads.get()
+            if request is None:
+                break
+            generation, before, limit, needle, done = request
+            while generation == self._read_generation:
+                try:
+                    entries = self._page(conn, before, limit, needle)
+                except sqlite3.OperationalError as error:
+                    # interrupt() can land on the request queued right after the cancelled one
+                    if "interrupt" not in str(error):
+                        raise
+                    continue
+                if generation == self._read_generation:
+                    done(entries)
+                break
+        self._search_conn = None
+        conn.close()
+
+    def flush(self):
+        # Blocks until everything appended so far is on disk
+        self._pending.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._pending.put(None)
+        self._writer.join()
+        if self._searcher is not None:
+            self.cancel_reads()
+            self._reads.put(None)
+            self._searcher.join()
+        self._reader.close()
+
+    def count(self):
+        self.flush()
+        return self._reader.execute("SELECT COUNT(*) FROM history").fetchone()[0]
+
+    def page(self, before=None, limit=200, needle=""):
+        # Entries with id < before, newest first, optionally containing needle
+        return self._page(self._reader, before, limit, needle)
+
+    def _page(self, conn, before, limit, needle):
+        with self._lock:
+            before = self._next_id if before is None else before
+            ring = list(self.ring)
+        entries = [e for e in reversed(ring) if e.id < before and (not needle or e.matches(needle))]
+        entries = entries[:limit]
+        if len(entries) >= limit:
+            return entries
+        floor = min(before, ring[0].id) if ring else before
+        if entries:
+            floor = min(floor, entries[-1].id)
+        if self._written_upto < floor - 1:
+            # The writer is more than a ring behind; wait for it rather than skip rows
+            self.flush()
+        sql = "SELECT id, ts, expression, result FROM history WHERE id < ?"
+        args = [floor]
+        if needle:
+            sql += " AND (instr(expression, ?) > 0 OR instr(result, ?) > 0)"
+            args += [needle, needle]
+        sql += " ORDER BY id DESC LIMIT ?"
+        args.append(limit - len(entries))
+        entries.extend(HistoryEntry(*row) for row in conn.execute(sql, args))
+        return entries
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+# Single-instance mode for PyCalc-SE.
+# The first copy started with --single-instance stays resident and listens on a
+# per-user local socket (QLocalServer). Later launches send it one JSON request
+# and exit: "show" raises the existing window, "eval" returns the value of an
+# expression (worked out in the resident copy's worker process, within its time
+# limit), "quit" ends the resident copy. The client
+# side uses the plain socket module (a named pipe on Windows), so a hand-off
+# finishes before Qt would even have been imported.
+#   python PyCalc-SE.py --single-instance
+#   python PyCalc-SE.py --eval "2^64-1"
+import os
+import sys
+import json
+import socket
+import argparse
+
+CONNECT_TIMEOUT = 0.2
+REPLY_TIMEOUT = 30.0
+
+
+def server_name():
+    try:
+        import getpass
+        user = getpass.getuser()
+    except Exception:
+        user = "user"
+    name = f"PyCalc-SE-{user}"
+    if os.name == 'nt':
+        return name
+    # A full path, so Qt and the socket module agree on where the socket lives
+    import tempfile
+    return os.path.join(tempfile.gettempdir(), name + ".sock")
+
+
+def _connect():
+    name = server_name()
+    if os.name == 'nt':
+        try:
+            return open(r'\\.\pipe' + '\\' + name, 'r+b', buffering=0)
+        except OSError:
+            return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(CONNECT_TIMEOUT)
+    try:
+        sock.connect(name)
+    except OSError:
+        sock.close()
+        return None
+    sock.settimeout(REPLY_TIMEOUT)
+    # Buffered, so a long reply is not read a byte at a time by readline()
+    stream = sock.makefile('rwb')
+    sock.close()
+    return stream
+
+
+def send_request(request):
+    # The resident instance's reply, or None when there is no resident instance
+    stream = _connect()
+    if stream is None:
+        return None
+    try:
+        stream.write(json.dumps(request).encode() + b"\n")
+        stream.flush()
+        line = stream.readline()
+    except OSError:
+        return None
+    finally:
+        stream.close()
+    return json.loads(line) if line else None
+
+
+def evaluate_request(expr, max_digits):
+    # Same evaluator and size limit as expression mode; ints come back in full
+    import pycalc_expr
+    from pycalc_engine import int_to_text
+    try:
+        if pycalc_expr.estimate_digits(expr) > max_digits:
+            raise OverflowError("result too large")
+        value = pycalc_expr.evaluate(expr)
+    except Exception as e:
+        return {"ok": False, "error": str(e) or type(e).__name__}
+    return {"ok": True, "result": int_to_text(value) if type(value) is int else str(value)}
+
+
+def hand_off(argv):
+    # Runs before the GUI imports. Returns an exit status when this launch is
+    # done, or None when it should go on and start the window itself.
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument("--single-instance", action="store_true")
+    parser.add_argument("--eval")
+    parser.add_argument("--quit", action="store_true")
+    args, _ = parser.parse_known_args(argv)
+    if args.eval is not None:
+        reply = send_request({"cmd": "eval", "expr": args.eval})
+        if reply is None:
+            from pycalc_compute import DEFAULT_MAX_DIGITS
+            reply = evaluate_request(args.eval, DEFAULT_MAX_DIGITS)
+        if not reply.get("ok"):
+            print(f"Error: {reply.get('error')}", file=sys.stderr)
+            return 1
+        print(reply["result"])
+        return 0
+    if args.quit:
+        send_request({"cmd": "quit"})
+        return 0
+    if args.single_instance and send_request({"cmd": "show"}) is not None:
+        return 0
+    return None
+
+
+def start_server(handler, parent=None):
+    # Listens for requests and passes each to handler(request, reply); the
+    # handler answers by calling reply(dict), at once or when its work is done.
+    # Returns the server, or None if another instance is already listening.
+    from PySide6.QtNetwork import QLocalServer
+    # Asked first: listen() on a socket path takes the path over even while
+    # another instance is serving on it
+    if send_request({"cmd": "ping"}) is not None:
+        return None
+    name = server_name()
+    server = QLocalServer(parent)
+    server.setSocketOptions(QLocalServer.UserAccessOption)
+    if not server.listen(name):
+        # Left behind by an instance that crashed
+        QLocalServer.removeServer(name)
+        if not server.listen(name):
+            return None
+
+    def attach(connection):
+        buffer = bytearray()
+        handled = False
+        connected = True
+
+        def reply(answer):
+            # The client may have given up waiting (REPLY_TIMEOUT) by now
+            nonlocal connected
+            if not connected:
+                return
+            connected = False
+            connection.write(json.dumps(answer).encode() + b"\n")
+            connection.flush()
+            connection.disconnectFromServer()
+
+        def serve():
+            nonlocal handled
+            if handled:
+                return
+            buffer.extend(bytes(connection.readAll()))
+            if b"\n" not in buffer:
+                return
+            handled = True
+            try:
+                handler(json.loads(buffer.split(b"\n", 1)[0]), reply)
+            except Exception as e:
+                reply({"ok": False, "error": str(e)})
+
+        def closed():
+            nonlocal connected
+            connected = False
+            connection.deleteLater()
+
+        connection.readyRead.connect(serve)
+        connection.disconnected.connect(closed)
+        if connection.bytesAvailable():
+            serve()
+
+    def accept():
+        while server.hasPendingConnections():
+            attach(server.nextPendingConnection())
+
+    server.newConnection.connect(accept)
+    return server
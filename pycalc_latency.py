@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# Opt-in keystroke-to-paint latency measurement for PyCalc-SE.
+#   python PyCalc-SE.py --latency-report [FILE]    (or PYCALC_LATENCY=FILE)
+# Nothing here is imported unless it is switched on: the probe wraps the
+# calculator's methods on one instance when installed, so the normal code paths
+# carry no timing code at all. Each input is timed from the key press (or button
+# click) through on_button, the engine handler that did the work, update_display
+# and the next paint of the display, and grouped by handler. On exit the
+# percentiles are written as JSON ('-' for stdout).
+import sys
+import json
+import time
+from array import array
+
+from PySide6.QtCore import QObject, QEvent
+from PySide6.QtWidgets import QApplication
+
+# Engine methods press() dispatches to; only the outermost one names the sample
+HANDLERS = (
+    'input_digit', 'input_decimal', 'input_operator', 'calculate_result',
+    'calculate_square', 'calculate_square_root', 'calculate_cube_root',
+    'toggle_sign', 'backspace', 'clear_entry', 'reset', '_press_minus', '_press_expression',
+)
+STAGES = ('dispatch', 'handler', 'display', 'paint', 'total')
+# Histogram bucket upper bounds in milliseconds; one frame at 60 Hz is 16.7 ms
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16.7, 33.3, 100, float('inf'))
+
+
+def percentile(ordered, fraction):
+    # Nearest-rank percentile of an already sorted sequence
+    if not ordered:
+        return None
+    rank = max(1, -(-len(ordered) * fraction // 1))
+    return ordered[int(rank) - 1]
+
+
+def histogram(ordered):
+    counts = [0] * len(BUCKETS_MS)
+    bucket = 0
+    for value in ordered:
+        while value > BUCKETS_MS[bucket]:
+            bucket += 1
+        counts[bucket] += 1
+    return counts
+
+
+class _Sample:
+    __slots__ = ('start', 'button', 'handler', 'handler_ms', 'display_start', 'display_end')
+
+    def __init__(self, start):
+        self.start = start
+        self.button = None
+        self.handler = None
+        self.handler_ms = 0.0
+        self.display_start = None
+        self.display_end = None
+
+
+class LatencyProbe(QObject):
+    def __init__(self, output="-"):
+        super().__init__()
+        self.output = output
+        # handler -> stage -> milliseconds
+        self.samples = {}
+        self._current = None
+
+    def install(self, calc):
+        calc.installEventFilter(self)
+        calc.display.installEventFilter(self)
+        self._display = calc.display
+        self._wrap(calc, 'on_button', self._timed_button)
+        self._wrap(calc, 'update_display', self._timed_display)
+        for name in HANDLERS:
+            self._wrap(calc.engine, name, self._timed_handler, name)
+        # press() looks actions up in a prebuilt table, so rebuild it from the wrappers
+        calc.engine._keys = calc.engine.key_table()
+        QApplication.instance().aboutToQuit.connect(self.write_report)
+
+    def _wrap(self, obj, name, timer, *extra):
+        original = getattr(obj, name)
+        setattr(obj, name, lambda *args: timer(original, args, *extra))
+
+    def eventFilter(self, obj, event):
+        kind = event.type()
+        if kind == QEvent.KeyPress and obj is not self._display:
+            self._finish(time.perf_counter(), painted=False)
+            self._current = _Sample(time.perf_counter())
+        elif kind == QEvent.Paint and obj is self._display:
+            self._finish(time.perf_counter(), painted=True)
+        return False
+
+    def _timed_button(self, original, args):
+        now = time.perf_counter()
+        sample = self._current
+        if sample is None or sample.button is not None:
+            # A button click, or a second token from one key press
+            self._finish(now, painted=False)
+            sample = self._current = _Sample(now)
+        sample.button = now
+        return original(*args)
+
+    def _timed_handler(self, original, args, name):
+        sample = self._current
+        if sample is None or sample.handler is not None:
+            return original(*args)
+        sample.handler = name
+        start = time.perf_counter()
+        try:
+            return original(*args)
+        finally:
+            sample.handler_ms = (time.perf_counter() - start) * 1000
+
+    def _timed_display(self, original, args):
+        sample = self._current
+        start = time.perf_counter()
+        result = original(*args)
+        if sample is not None and sample.button is not None:
+            sample.display_start = start
+            sample.display_end = time.perf_counter()
+        return result
+
+    def _finish(self, now, painted):
+        # Records the pending input once its display update reached the screen;
+        # an update that changed nothing never paints, so it ends at update_display
+        sample = self._current
+        if sample is None or sample.display_end is None:
+            if not painted:
+                self._current = None
+            return
+        self._current = None
+        end = now if painted else sample.display_end
+        stages = self.samples.get(sample.handler or 'none')
+        if stages is None:
+            stages = self.samples[sample.handler or 'none'] = {stage: array('d') for stage in STAGES}
+        stages['dispatch'].append((sample.button - sample.start) * 1000)
+        stages['handler'].append(sample.handler_ms)
+        stages['display'].append((sample.display_end - sample.display_start) * 1000)
+        stages['paint'].append((end - sample.display_end) * 1000)
+        stages['total'].append((end - sample.start) * 1000)
+
+    def report(self):
+        handlers = {}
+        for name, stages in sorted(self.samples.items()):
+            entry = {}
+            for stage, values in stages.items():
+                ordered = sorted(values)
+                entry[stage] = {
+                    "p50_ms": round(percentile(ordered, 0.50), 4),
+                    "p95_ms": round(percentile(ordered, 0.95), 4),
+                    "p99_ms": round(percentile(ordered, 0.99), 4),
+                    "max_ms": round(ordered[-1], 4),
+                }
+            total = sorted(stages['total'])
+            entry["count"] = len(total)
+            entry["histogram"] = {"le_ms": [str(b) for b in BUCKETS_MS], "counts": histogram(total)}
+            handlers[name] = entry
+        return {"inputs": sum(entry["count"] for entry in handlers.values()), "handlers": handlers}
+
+    def write_report(self):
+        self._finish(time.perf_counter(), painted=False)
+        text = json.dumps(self.report())
+        if self.output == "-":
+            if sys.stdout is not None:
+                print(text, flush=True)
+        else:
+            with open(self.output, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
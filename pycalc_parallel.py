@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# Parallel evaluation of a file of expressions for PyCalc-SE.
+# Big-int powers and products hold the GIL, so the lines are sharded in chunks
+# across worker processes. Results are written in input order as soon as every
+# earlier line is done. A line that fails, would exceed the digit limit or runs
+# past the time limit gives "Error", as on the calculator; a worker over the
+# limit is terminated (the only way to stop a big-int operation), the rest of
+# its chunk goes back to the front of the queue and a fresh worker takes over.
+#   python pycalc_parallel.py exprs.txt [--workers 8] [--timeout 10] [--report]
+#   python PyCalc-SE.py --eval-file exprs.txt ...
+import os
+import sys
+import json
+import time
+import argparse
+import multiprocessing
+from collections import deque
+from itertools import islice
+from multiprocessing.connection import wait
+
+from pycalc_engine import int_to_text
+from pycalc_expr import evaluate, estimate_digits
+from pycalc_compute import DEFAULT_TIME_LIMIT, DEFAULT_MAX_DIGITS
+
+DEFAULT_CHUNK_LINES = 16
+# Finished results held back waiting for a slow earlier line, per worker,
+# before the workers stop being handed more lines
+_BACKLOG_CHUNKS = 64
+
+
+def evaluate_line(expr, max_digits):
+    # Same evaluator, size limit and output as --eval; failures give "Error"
+    # just as handle_calculation_error() does in the window
+    try:
+        if estimate_digits(expr) > max_digits:
+            return "Error"
+        value = evaluate(expr)
+        return int_to_text(value) if type(value) is int else str(value)
+    except Exception:
+        return "Error"
+
+
+def _worker(conn, max_digits):
+    # Answers every line of a chunk separately, so the parent knows which line
+    # is running and when it started
+    while True:
+        try:
+            chunk = conn.recv()
+        except (EOFError, OSError):
+            return
+        for index, expr in chunk:
+            conn.send((index, evaluate_line(expr, max_digits)))
+
+
+class _Worker:
+    __slots__ = ('process', 'conn', 'pending', 'started')
+
+    def __init__(self, ctx, max_digits):
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(target=_worker, args=(child, max_digits), daemon=True,
+                                   name="pycalc-parallel")
+        self.process.start()
+        child.close()
+        self.pending = deque()
+        self.started = None
+
+    def stop(self, kill=False):
+        if kill:
+            self.process.terminate()
+        self.conn.close()
+        self.process.join(1)
+
+
+def evaluate_lines(lines, workers=None, timeout=DEFAULT_TIME_LIMIT, chunk_lines=DEFAULT_CHUNK_LINES,
+                   max_digits=DEFAULT_MAX_DIGITS, stats=None):
+    # Yields one result per line, in order; blank lines give blank results.
+    # stats, if given, gets the running counts.
+    workers = max(1, workers or os.cpu_count() or 1)
+    stats = {} if stats is None else stats
+    stats.update(lines=0, errors=0, timeouts=0, restarts=0)
+    ctx = multiprocessing.get_context("spawn")
+    source = enumerate(lines)
+    exhausted = False
+    # Lines given back by a stopped worker; they are the oldest, so they go first
+    retry = deque()
+    # index -> result, until every earlier line is done
+    done = {}
+    next_index = 0
+    backlog = workers * chunk_lines * _BACKLOG_CHUNKS
+
+    def next_chunk():
+        nonlocal exhausted
+        if retry:
+            return [retry.popleft() for _ in range(min(chunk_lines, len(retry)))]
+        chunk = []
+        read = 0
+        for index, line in islice(source, chunk_lines):
+            read += 1
+            expr = line.strip()
+            if expr:
+                chunk.append((index, expr))
+            else:
+                done[index] = ""
+        exhausted = read < chunk_lines
+        return chunk
+
+    def finish(index, text):
+        done[index] = text
+        if text == "Error":
+            stats['errors'] += 1
+
+    def replace(i):
+        # A worker that died or ran out of time: its current line is an error,
+        # the rest of its chunk is handed out again
+        pool[i].stop(kill=True)
+        pending = pool[i].pending
+        finish(pending.popleft()[0], "Error")
+        retry.extendleft(reversed(pending))
+        pool[i] = _Worker(ctx, max_digits)
+        stats['restarts'] += 1
+
+    pool = [_Worker(ctx, max_digits) for _ in range(workers)]
+    try:
+        while True:
+            now = time.monotonic()
+            for worker in pool:
+                while not worker.pending and (retry or not exhausted) and len(done) < backlog:
+                    chunk = next_chunk()
+                    if chunk:
+                        worker.conn.send(chunk)
+                        worker.pending.extend(chunk)
+                        worker.started = now
+            while next_index in done:
+                yield done.pop(next_index)
+                next_index += 1
+                stats['lines'] += 1
+            busy = [worker for worker in pool if worker.pending]
+            if not busy:
+                if exhausted and not retry:
+                    return
+                continue
+            wait_for = None
+            if timeout:
+                wait_for = max(0.0, min(worker.started for worker in busy) + timeout - now)
+            ready = wait([worker.conn for worker in busy], wait_for)
+            now = time.monotonic()
+            for i, worker in enumerate(pool):
+                if not worker.pending:
+                    continue
+                if worker.conn in ready:
+                    try:
+                        while worker.pending and worker.conn.poll():
+                            index, text = worker.conn.recv()
+                            worker.pending.popleft()
+                            worker.started = now
+                            finish(index, text)
+                    except (EOFError, OSError):
+                        # The worker died, e.g. out of memory
+                        replace(i)
+                elif timeout and now - worker.started > timeout:
+                    stats['timeouts'] += 1
+                    replace(i)
+    finally:
+        for worker in pool:
+            worker.stop(kill=bool(worker.pending))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="pycalc_parallel",
+                                     description="Evaluate a file of calculator expressions, one per line, "
+                                                 "on every CPU core.")
+    parser.add_argument("input", help="file with one expression per line ('-' for stdin)")
+    parser.add_argument("--output", "-o", metavar="FILE", help="write results here instead of stdout")
+    parser.add_argument("--workers", "-j", type=int, metavar="N", help="worker processes (default: one per core)")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIME_LIMIT, metavar="S",
+                        help=f"give \"Error\" for a line that takes longer (default {DEFAULT_TIME_LIMIT:g}, 0 for none)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_LINES, metavar="LINES",
+                        help="lines handed to a worker at a time")
+    parser.add_argument("--max-digits", type=int, default=DEFAULT_MAX_DIGITS, metavar="N",
+                        help="give \"Error\" for results longer than N digits")
+    parser.add_argument("--report", nargs="?", const="-", metavar="FILE",
+                        help="write line count, errors and throughput as JSON (to stderr, or FILE)")
+    args, _ = parser.parse_known_args(argv)
+
+    source = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    out = open(args.output, "w", encoding="utf-8", newline="\n") if args.output else sys.stdout
+    workers = max(1, args.workers or os.cpu_count() or 1)
+    stats = {}
+    start = time.perf_counter()
+    results = evaluate_lines(source, workers, args.timeout, max(1, args.chunk_size), args.max_digits, stats)
+    try:
+        for text in results:
+            out.write(text)
+            out.write("\n")
+        out.flush()
+    except BrokenPipeError:
+        # The reader went away (e.g. head); stop quietly like other filters
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except KeyboardInterrupt:
+        return 130
+    finally:
+        # Stops the workers
+        results.close()
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+    seconds = time.perf_counter() - start
+    if args.report:
+        report = dict(stats, workers=workers, seconds=round(seconds, 3),
+                      lines_per_s=round(stats['lines'] / seconds, 1) if seconds else None)
+        text = json.dumps(report)
+        if args.report == "-":
+            print(text, file=sys.stderr)
+        else:
+            with open(args.report, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# Pasting a block of numbers into PyCalc-SE (Ctrl+V), e.g. a column copied from
+# a report. The text is read once, a chunk of lines at a time, and every number
+# is parsed as a decimal.Decimal, so the sum is exact (0.1 + 0.2 is 0.3) before
+# it becomes the calculator's int or float. Numbers may be separated by new
+# lines, spaces, tabs, semicolons or commas; "1,234.50" is read with thousands
+# separators. Anything else (headings, currency) is skipped and counted.
+import re
+import math
+import decimal
+
+from pycalc_engine import format_number, int_digits
+from pycalc_compute import DEFAULT_MAX_DIGITS
+
+# Pastes longer than this are summed in the compute worker process
+OFFLOAD_CHARS = 200_000
+# Read this much text at a time, to the end of a line
+_CHUNK_CHARS = 1 << 20
+_THOUSANDS_RE = re.compile(r'[+-]?\d{1,3}(?:,\d{3})+(?:\.\d*)?')
+
+
+class PasteSummary:
+    # Count, exact sum, mean, min and max as calculator numbers (int unless a
+    # value was written with a point or an exponent), and how much was skipped
+    __slots__ = ('count', 'total', 'mean', 'minimum', 'maximum', 'skipped')
+
+    def __init__(self, count, total, mean, minimum, maximum, skipped):
+        self.count = count
+        self.total = total
+        self.mean = mean
+        self.minimum = minimum
+        self.maximum = maximum
+        self.skipped = skipped
+
+
+def _parse_tokens(tokens):
+    # The careful path: one token at a time, for chunks that hold more than plain numbers
+    values = []
+    skipped = 0
+    integral = True
+    for token in tokens:
+        if ',' in token and not _THOUSANDS_RE.fullmatch(token):
+            parts = token.split(',')
+        else:
+            parts = (token.replace(',', ''),)
+        for part in parts:
+            if not part:
+                continue
+            try:
+                value = decimal.Decimal(part)
+            except decimal.InvalidOperation:
+                skipped += 1
+                continue
+            if not value.is_finite():
+                skipped += 1
+                continue
+            values.append(value)
+            if integral and ('.' in part or 'e' in part or 'E' in part):
+                integral = False
+    return values, skipped, integral
+
+
+def _as_number(value, integral):
+    if integral:
+        return int(value)
+    number = float(value)
+    if not math.isfinite(number):
+        raise OverflowError("pasted numbers are too large")
+    return number
+
+
+def summarize(text, max_digits=DEFAULT_MAX_DIGITS):
+    # Raises ValueError when there is no number in text, OverflowError when the
+    # sum would pass max_digits. Decimal additions are exact up to max_digits;
+    # past that Inexact is raised rather than the sum rounded.
+    context = decimal.Context(prec=max_digits, Emax=decimal.MAX_EMAX, Emin=decimal.MIN_EMIN,
+                              traps=[decimal.Inexact, decimal.InvalidOperation])
+    Decimal = decimal.Decimal
+    total = Decimal(0)
+    # Chunks of whole numbers are added up as ints, which parse faster
+    int_total = 0
+    minimum = maximum = None
+    count = skipped = 0
+    integral = True
+    start = 0
+    length = len(text)
+    try:
+        with decimal.localcontext(context):
+            while start < length:
+                end = text.find('\n', start + _CHUNK_CHARS)
+                end = length if end < 0 else end + 1
+                chunk = text[start:end]
+                start = end
+                if ';' in chunk:
+                    chunk = chunk.replace(';', ' ')
+                if '−' in chunk:
+                    chunk = chunk.replace('−', '-')
+                tokens = chunk.split()
+                if not tokens:
+                    continue
+                try:
+                    # Plain columns of numbers parse and add up without a Python-level loop
+                    if '.' in chunk or 'e' in chunk or 'E' in chunk:
+                        values = list(map(Decimal, tokens))
+                        part = sum(values, Decimal(0))
+                        if not part.is_finite():
+                            raise decimal.InvalidOperation
+                        total += part
+                        integral = False
+                    else:
+                        values = list(map(int, tokens))
+                        int_total += sum(values)
+                except (ValueError, decimal.InvalidOperation):
+                    values, bad, chunk_integral = _parse_tokens(tokens)
+                    skipped += bad
+                    integral = integral and chunk_integral
+                    if not values:
+                        continue
+                    total += sum(values, Decimal(0))
+                count += len(values)
+                low = min(values)
+                high = max(values)
+                if minimum is None or low < minimum:
+                    minimum = low
+                if maximum is None or high > maximum:
+                    maximum = high
+        if not integral and int_total:
+            total = context.add(total, Decimal(int_total))
+    except decimal.Inexact:
+        raise OverflowError(f"the sum has more than {max_digits} digits") from None
+    if not count:
+        raise ValueError("no numbers to paste")
+    if integral:
+        total_number = int(total) + int_total
+        if int_digits(total_number) > max_digits:
+            raise OverflowError(f"the sum has more than {max_digits} digits")
+        whole, remainder = divmod(total_number, count)
+        if not remainder:
+            mean = whole
+        elif total_number.bit_length() < 1000:
+            mean = total_number / count
+        else:
+            # Too large for a float: the nearest int will do
+            mean = (2 * total_number + count) // (2 * count)
+    else:
+        total_number = _as_number(total, False)
+        mean = float(decimal.Context(prec=20).divide(total, count))
+    return PasteSummary(count, total_number, mean, _as_number(minimum, integral),
+                        _as_number(maximum, integral), skipped)
+
+
+def history_text(summary):
+    # History line for a pasted sum; one number on its own needs none
+    if summary.count == 1 and not summary.skipped:
+        return ""
+    parts = [f"{summary.count} value{'s' if summary.count > 1 else ''}", f"min {format_number(summary.minimum)}",
+             f"max {format_number(summary.maximum)}", f"mean {format_number(summary.mean)}"]
+    if summary.skipped:
+        parts.append(f"{summary.skipped} skipped")
+    return " · ".join(parts) + " · Σ ="
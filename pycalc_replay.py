@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+# Recording and replay of calculator input, for bug reports and load tests.
+# A recording is the stream of on_button tokens, one character per token (see
+# CODES), after a header line. A paste is recorded with the text pasted, as 'V'
+# and a JSON string on a line of its own. The file is line buffered and breaks
+# the line after every '=', so a crash loses at most the calculation being typed.
+# Replay feeds the tokens back as fast as possible: headless through
+# CalculatorEngine here, or through the window with PyCalc-SE.py --replay.
+#   python pycalc_replay.py session.keys [--repeat 100]
+import sys
+import json
+import time
+import argparse
+from functools import partial
+
+# Ctrl+E is recorded too, since it changes what every later token means, and
+# so are undo and redo (Ctrl+Z, Ctrl+Y)
+MODE_TOKEN = 'mode'
+UNDO_TOKEN = 'undo'
+REDO_TOKEN = 'redo'
+CONTROL_TOKENS = {MODE_TOKEN: 'toggle_expression_mode', UNDO_TOKEN: 'undo', REDO_TOKEN: 'redo'}
+# A paste (Ctrl+V) is the token (PASTE_TOKEN, text), replayed through paste_text(text)
+PASTE_TOKEN = 'paste'
+PASTE_CODE = 'V'
+# Tokens longer than one character; every other token is its own code
+CODES = {'xʸ': '^', 'x²': '²', '√x': '√', '∛x': '∛', '+/-': '±', 'CE': 'E',
+         MODE_TOKEN: '@', UNDO_TOKEN: '<', REDO_TOKEN: '>'}
+TOKENS = {code: token for token, code in CODES.items()}
+HEADER = "#pycalc-keys 2"
+# Recordings from before pastes were recorded read the same way
+HEADERS = (HEADER, "#pycalc-keys 1")
+_json_decoder = json.JSONDecoder()
+
+
+def encode_token(token):
+    if type(token) is tuple:
+        return PASTE_CODE + json.dumps(token[1], ensure_ascii=False) + "\n"
+    return CODES.get(token, token)
+
+
+def encode(tokens):
+    return ''.join(map(encode_token, tokens))
+
+
+def decode(text):
+    if PASTE_CODE not in text:
+        return [TOKENS.get(code, code) for code in text if not code.isspace()]
+    tokens = []
+    i = 0
+    length = len(text)
+    while i < length:
+        code = text[i]
+        if code == PASTE_CODE:
+            pasted, i = _json_decoder.raw_decode(text, i + 1)
+            tokens.append((PASTE_TOKEN, pasted))
+            continue
+        if not code.isspace():
+            tokens.append(TOKENS.get(code, code))
+        i += 1
+    return tokens
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        header = f.readline().rstrip("\n")
+        if header not in HEADERS:
+            raise ValueError(f"{path} is not a PyCalc-SE key recording")
+        return decode(f.read())
+
+
+class KeyRecorder:
+    def __init__(self, path):
+        self._file = open(path, "w", encoding="utf-8", newline="\n", buffering=1)
+        self._file.write(HEADER + "\n")
+
+    def record(self, token):
+        code = encode_token(token)
+        if self._file is None:
+            return
+        if type(token) is tuple:
+            self._file.write(code)
+        elif len(code) == 1:
+            self._file.write(code + "\n" if code == '=' else code)
+
+    def install(self, calc):
+        # Wraps the one window's entry points; without a recorder nothing is wrapped
+        on_button = calc.on_button
+
+        def recorded_button(token):
+            self.record(token)
+            on_button(token)
+
+        def recorded_control(token, action):
+            self.record(token)
+            action()
+
+        paste_text = calc.paste_text
+
+        def recorded_paste(text):
+            self.record((PASTE_TOKEN, text))
+            paste_text(text)
+
+        calc.on_button = recorded_button
+        for token, name in CONTROL_TOKENS.items():
+            setattr(calc, name, partial(recorded_control, token, getattr(calc, name)))
+        calc.paste_text = recorded_paste
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def controls(target):
+    # Control token -> action, from a window or anything with the same method names
+    actions = {token: getattr(target, name) for token, name in CONTROL_TOKENS.items()}
+    actions[PASTE_TOKEN] = target.paste_text
+    return actions
+
+
+def replay(tokens, press, actions):
+    # Feeds tokens to press(), or to actions for control tokens and pastes, with
+    # nothing in between; returns the seconds taken
+    start = time.perf_counter()
+    for token in tokens:
+        if type(token) is tuple:
+            actions[token[0]](token[1])
+            continue
+        action = actions.get(token)
+        if action is not None:
+            action()
+        else:
+            press(token)
+    return time.perf_counter() - start
+
+
+def report(tokens, seconds, display, history):
+    return {
+        "tokens": tokens,
+        "seconds": round(seconds, 6),
+        "tokens_per_s": round(tokens / seconds) if seconds else None,
+        "display": display,
+        "history": history,
+    }
+
+
+def replay_headless(tokens, repeat=1):
+    from pycalc_engine import CalculatorEngine
+    from pycalc_compute import DEFAULT_MAX_DIGITS
+    engine = CalculatorEngine()
+    engine.max_result_digits = DEFAULT_MAX_DIGITS
+    engine.enable_undo()
+
+    def paste(text):
+        # As the window does it; a paste that fails leaves the engine as it was
+        import pycalc_paste
+        if not text or text.isspace():
+            return
+        try:
+            summary = pycalc_paste.summarize(text, engine.max_result_digits)
+        except (ValueError, OverflowError):
+            return
+        engine.set_value(summary.total, pycalc_paste.history_text(summary))
+
+    actions = {
+        MODE_TOKEN: lambda: engine.set_expression_mode(engine.expression is None),
+        UNDO_TOKEN: engine.undo,
+        REDO_TOKEN: engine.redo,
+        PASTE_TOKEN: paste,
+    }
+    seconds = 0.0
+    for _ in range(repeat):
+        engine.set_expression_mode(False)
+        seconds += replay(tokens, engine.press, actions)
+    return report(len(tokens) * repeat, seconds, engine.display_text(), engine.expression_history)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="pycalc_replay",
+                                     description="Replay a PyCalc-SE key recording without a window.")
+    parser.add_argument("recording")
+    parser.add_argument("--repeat", type=int, default=1, help="replay this many times, from a reset each time")
+    args = parser.parse_args(argv)
+    print(json.dumps(replay_headless(load(args.recording), max(1, args.repeat))))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# Update check for PyCalc-SE.
+# The last answer is kept in a QSettings-like store (anything with value()/setValue())
+# together with its ETag/Last-Modified, so launches inside the TTL never touch the
+# network and later checks are conditional requests.
+import time
+
+UPDATE_TTL_SECONDS = 24 * 60 * 60
+
+KEY_VERSION = "update/latest_version"
+KEY_CHECKED_AT = "update/checked_at"
+KEY_ETAG = "update/etag"
+KEY_LAST_MODIFIED = "update/last_modified"
+
+
+def parse_version(text):
+    # "1.10" -> (1, 10), "v2.0-beta" -> (2,), so that 1.10 sorts after 1.5
+    parts = []
+    for piece in str(text).strip().lstrip("vV").split("."):
+        digits = ""
+        for ch in piece:
+            if not ch.isdigit():
+                break
+            digits += ch
+        parts.append(int(digits) if digits else 0)
+    # 1.5 and 1.5.0 are the same release
+    while len(parts) > 1 and parts[-1] == 0:
+        parts.pop()
+    return tuple(parts)
+
+
+def update_message(latest_version, current_version):
+    latest = parse_version(latest_version)
+    current = parse_version(current_version)
+    if latest > current:
+        return f"🎉 PyCalc-SE v{latest_version} is OUT NOW!"
+    elif latest < current:
+        return "⚠️ This is a Dev. Build of PyCalc-SE!"
+    return "🎉 PyCalc-SE is up to date!"
+
+
+def fetch_latest_version(url, settings, ttl=UPDATE_TTL_SECONDS, timeout=5, now=None):
+    # Returns the latest published version string; raises on network/HTTP errors
+    now = time.time() if now is None else now
+    cached = settings.value(KEY_VERSION)
+    try:
+        checked_at = float(settings.value(KEY_CHECKED_AT) or 0)
+    except (TypeError, ValueError):
+        checked_at = 0.0
+    if cached and 0 <= now - checked_at < ttl:
+        return cached
+
+    import requests
+    headers = {}
+    if cached:
+        etag = settings.value(KEY_ETAG)
+        last_modified = settings.value(KEY_LAST_MODIFIED)
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    response = requests.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 304 and cached:
+        latest_version = cached
+    else:
+        response.raise_for_status()
+        latest_version = response.text.strip()
+        settings.setValue(KEY_VERSION, latest_version)
+        settings.setValue(KEY_ETAG, response.headers.get("ETag", ""))
+        settings.setValue(KEY_LAST_MODIFIED, response.headers.get("Last-Modified", ""))
+    settings.setValue(KEY_CHECKED_AT, now)
+    return latest_version
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# Tests for the calculator engine in pycalc_engine: the number kernels and the
+# typing buffer, and the engine driven by key sequences the way the GUI and the
+# CLI drive it.
+#   python -m pytest tests   (or python -m unittest discover tests)
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pycalc_engine import (CalculatorEngine, NumberEntry, apply_operator, cube_root, estimate_digits, fit_display,
+                           format_number, int_digits, int_from_digits, int_to_text, integer_root, square,
+                           square_root)
+from pycalc_compute import DEFAULT_MAX_DIGITS
+
+
+def make_engine():
+    engine = CalculatorEngine()
+    engine.max_result_digits = DEFAULT_MAX_DIGITS
+    return engine
+
+
+class KernelTest(unittest.TestCase):
+    def test_int_text_round_trip(self):
+        limit = sys.get_int_max_str_digits() if hasattr(sys, "get_int_max_str_digits") else None
+        if limit is not None:
+            sys.set_int_max_str_digits(0)
+            self.addCleanup(sys.set_int_max_str_digits, limit)
+        rng = random.Random(1)
+        for digits in (1, 17, 4300, 4301, 20000, 120000):
+            n = rng.randrange(10 ** (digits - 1), 10 ** digits)
+            self.assertEqual(int_to_text(n), str(n))
+            self.assertEqual(int_to_text(-n), str(-n))
+            self.assertEqual(int_from_digits(list(str(n))), n)
+            self.assertEqual(int_digits(n), digits)
+        self.assertEqual(int_digits(0), 1)
+
+    def test_integer_root(self):
+        rng = random.Random(5)
+        for k in (2, 3, 5):
+            for bits in (1, 10, 64, 300, 5000):
+                n = rng.getrandbits(bits)
+                root = integer_root(n, k)
+                self.assertLessEqual(root ** k, n)
+                self.assertGreater((root + 1) ** k, n)
+
+    def test_roots_stay_exact_for_perfect_powers(self):
+        self.assertEqual(square_root(10 ** 100), 10 ** 50)
+        self.assertIs(type(square_root(10 ** 100)), int)
+        self.assertEqual(cube_root(-27), -3)
+        self.assertEqual(cube_root(7 ** 900), 7 ** 300)
+        self.assertEqual(square_root(2), 2 ** 0.5)
+        self.assertEqual(square_root(2.25), 1.5)
+        self.assertEqual((square(3), square(1.5)), (9, 2.25))
+
+    def test_apply_operator(self):
+        self.assertEqual(apply_operator('/', 7, 2), 3.5)
+        self.assertEqual(apply_operator('**', 2, 10), 1024)
+        self.assertEqual(apply_operator('-', 1, 3), -2)
+
+    def test_formatting(self):
+        self.assertEqual(format_number(12), "12")
+        self.assertEqual(format_number(10 ** 5000), "1e+5000")
+        self.assertEqual(fit_display(123456789, 5), "1e+8")
+        self.assertEqual(fit_display(1234567, 20, True), "1,234,567")
+
+
+class NumberEntryTest(unittest.TestCase):
+    def test_typing(self):
+        entry = NumberEntry()
+        for digit in "0012":
+            entry.append_digit(digit)
+        entry.append_point()
+        entry.append_digit('5')
+        self.assertEqual((entry.text(), entry.value()), ("12.5", 12.5))
+        entry.pop()
+        entry.pop()
+        self.assertEqual((entry.text(), entry.value()), ("12", 12))
+        entry.toggle_sign()
+        self.assertEqual(entry.value(), -12)
+
+    def test_pop_keeps_the_buffer_for_undo(self):
+        entry = NumberEntry()
+        entry.append_digits("1234")
+        digits = entry.digits
+        entry.pop()
+        entry.append_digit('9')
+        self.assertEqual(digits[:4], list("1234"))
+        self.assertEqual(entry.text(), "1239")
+
+    def test_from_text(self):
+        self.assertEqual(NumberEntry.from_text("-0.50").text(), "-0.50")
+        self.assertIsNone(NumberEntry.from_text("1e+16"))
+        self.assertIsNone(NumberEntry.from_text("Error"))
+
+    def test_long_input(self):
+        entry = NumberEntry()
+        entry.append_digits("9" * 50000)
+        self.assertEqual(entry.value(), 10 ** 50000 - 1)
+
+
+class HugeExponentTest(unittest.TestCase):
+    EXPONENT = "1" + "0" * 400
+
+    def test_estimate_does_not_overflow(self):
+        self.assertEqual(estimate_digits('**', 2, int(self.EXPONENT)), float('inf'))
+        self.assertEqual(estimate_digits('**', 10, 5), 6)
+
+    def test_job_digits_is_over_the_limit(self):
+        engine = make_engine()
+        engine.feed("2xʸ" + self.EXPONENT)
+        digits = engine.job_digits(engine.pending_operation())
+        self.assertGreater(digits, engine.max_result_digits)
+
+    def test_equals_shows_error(self):
+        engine = make_engine()
+        self.assertEqual(engine.feed("2xʸ" + self.EXPONENT + "="), "Error")
+        self.assertEqual(engine.feed("C2xʸ10="), "1024")
+
+
+class ExpressionModeTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = make_engine()
+        self.engine.set_expression_mode(True)
+
+    def test_operator_continues_from_the_exact_result(self):
+        # The display shows 2^50000 in scientific notation; the next step must not use that
+        self.engine.feed("2xʸ50000=")
+        self.engine.feed("-1=")
+        self.assertEqual(self.engine._currentNumber, 2 ** 50000 - 1)
+
+    def test_negative_result_is_one_operand(self):
+        self.engine.feed("0-5=")
+        self.assertEqual(self.engine.feed("xʸ2="), "25")
+        self.assertEqual(self.engine.feed("x²="), "625")
+
+    def test_float_result_keeps_every_digit(self):
+        self.engine.feed("1÷3=")
+        self.engine.feed("×3=")
+        self.assertEqual(self.engine._currentNumber, 1)
+
+
+class SetValueTest(unittest.TestCase):
+    # set_value() is how a pasted sum reaches the engine
+    def setUp(self):
+        self.engine = make_engine()
+        self.engine.enable_undo()
+
+    def test_value_continues_the_chain(self):
+        self.engine.set_value(6, "2 values · Σ =")
+        self.assertEqual(self.engine.feed("+1="), "7")
+
+    def test_value_is_second_operand_of_pending_operator(self):
+        self.engine.feed("5+")
+        self.engine.set_value(6, "2 values · Σ =")
+        self.assertEqual(self.engine.expression_history, "5 + ")
+        self.assertEqual(self.engine.feed("="), "11")
+        self.engine.reset()
+        self.engine.feed("5+")
+        self.engine.set_value(6)
+        self.assertEqual(self.engine.feed("×2="), "22")
+
+    def test_value_after_operator_on_a_result(self):
+        self.engine.feed("5+3=×")
+        self.engine.set_value(4)
+        self.assertEqual(self.engine.feed("="), "32")
+        self.assertEqual(self.engine.expression_history, "8 × 4 =")
+
+    def test_undo_restores_pending_operator(self):
+        self.engine.feed("5+")
+        self.engine.set_value(6)
+        self.engine.undo()
+        self.assertEqual(self.engine.feed("3="), "8")
+
+    def test_expression_mode_appends_after_operator(self):
+        self.engine.set_expression_mode(True)
+        self.engine.feed("5+")
+        self.engine.set_value(-6)
+        self.assertEqual(self.engine.display_text(), "5+(-6)")
+        self.assertEqual(self.engine.feed("="), "-1")
+        self.engine.feed("C5+2")
+        self.engine.set_value(6)
+        self.assertEqual(self.engine.feed("+1="), "7")
+
+
+class LoadTextTest(unittest.TestCase):
+    # load_text() is how a result picked in the history panel reaches the engine
+    def setUp(self):
+        self.engine = make_engine()
+
+    def test_picked_result_is_second_operand_of_pending_operator(self):
+        self.engine.feed("5+")
+        self.assertTrue(self.engine.load_text("-2.5"))
+        self.assertEqual(self.engine.feed("="), "2.5")
+
+    def test_picked_result_starts_a_chain(self):
+        self.assertTrue(self.engine.load_text("12"))
+        self.assertEqual(self.engine.feed("×2="), "24")
+
+    def test_text_that_is_not_a_number_changes_nothing(self):
+        self.engine.feed("5+")
+        self.assertFalse(self.engine.load_text("Error"))
+        self.assertEqual(self.engine.feed("1="), "6")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# Tests for expression mode in pycalc_expr: the parser and its error text,
+# folding split top-level terms, the compiled-expression cache, and the
+# expression being typed.
+#   python -m pytest tests   (or python -m unittest discover tests)
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pycalc_expr
+from pycalc_expr import (ExpressionError, ExpressionInput, compile_expression, compile_ast, evaluate,
+                         estimate_digits, parse, split_terms, VALUE_CACHE_BITS)
+
+
+class ParserTest(unittest.TestCase):
+    def test_precedence_and_associativity(self):
+        self.assertEqual(evaluate("2+3×4"), 14)
+        self.assertEqual(evaluate("2^3^2"), 512)
+        self.assertEqual(evaluate("-2^2"), -4)
+        self.assertEqual(evaluate("(-2)^2"), 4)
+        self.assertEqual(evaluate("2^-1"), 0.5)
+        self.assertEqual(evaluate("10-4-3"), 3)
+
+    def test_functions_and_postfix_square(self):
+        self.assertEqual(evaluate("3²+√16"), 13)
+        self.assertEqual(evaluate("∛27×2"), 6)
+        self.assertEqual(evaluate("sqrt(16)+sqr(3)+cbrt(8)"), 15)
+        self.assertEqual(evaluate("2²²"), 16)
+
+    def test_ascii_spellings_and_spaces(self):
+        self.assertEqual(evaluate("2**10"), 1024)
+        self.assertEqual(evaluate("2 * 3 / 4"), 1.5)
+        self.assertEqual(evaluate("5 − 2"), 3)
+
+    def test_ints_stay_exact(self):
+        self.assertEqual(evaluate("2^200+1"), 2 ** 200 + 1)
+        self.assertEqual(evaluate("√(10^100)"), 10 ** 50)
+        self.assertEqual(evaluate("7÷7"), 1)
+        self.assertIs(type(evaluate("7÷7")), int)
+        self.assertEqual(evaluate("10÷4"), 2.5)
+
+    def test_ast_shape(self):
+        self.assertEqual(parse("1+2×x"), ('chain', ('num', 1), (('+', ('chain', ('num', 2), (('*', ('var', 'x')),))),)))
+        self.assertEqual(parse("√2²"), ('sqrt', ('sq', ('num', 2))))
+
+    def test_variables(self):
+        self.assertEqual(evaluate("a×b+c", {'a': 2, 'b': 3, 'c': 4}), 10)
+        self.assertEqual(compile_ast(parse("x^2"))({'x': 9}), 81)
+
+
+class ErrorTextTest(unittest.TestCase):
+    def assert_error(self, text, message):
+        with self.assertRaises(ExpressionError) as caught:
+            evaluate(text)
+        self.assertEqual(str(caught.exception), message)
+
+    def test_messages(self):
+        self.assert_error("1,5", "unexpected character ','")
+        self.assert_error("", "missing operand")
+        self.assert_error("2+", "missing operand")
+        self.assert_error("(1+2", "expected ')'")
+        self.assert_error("2×", "unexpected end of expression")
+        self.assert_error("2)", "unexpected ')'")
+        self.assert_error("x+1", "unknown name 'x'")
+
+    def test_arithmetic_errors_are_not_expression_errors(self):
+        with self.assertRaises(ZeroDivisionError):
+            evaluate("1÷0")
+        with self.assertRaises(ValueError):
+            evaluate("√-4")
+
+    def test_expression_error_is_a_value_error(self):
+        self.assertTrue(issubclass(ExpressionError, ValueError))
+
+
+class SplitTermsTest(unittest.TestCase):
+    def test_splits_at_top_level_plus_and_minus(self):
+        self.assertEqual(split_terms("2×3-4+5"), [('+', '2×3'), ('-', '4'), ('+', '5')])
+        self.assertEqual(split_terms("(1+2)-3×(4-5)"), [('+', '(1+2)'), ('-', '3×(4-5)')])
+        self.assertEqual(split_terms("-3+4"), [('+', '-3'), ('+', '4')])
+        self.assertEqual(split_terms("2^-1+1"), [('+', '2^-1'), ('+', '1')])
+
+    def test_exponent_sign_is_part_of_the_number(self):
+        self.assertEqual(split_terms("1e+16-2"), [('+', '1e+16'), ('-', '2')])
+        self.assertEqual(split_terms("(1e-3)+x"), [('+', '(1e-3)'), ('+', 'x')])
+
+    def test_folding_terms_matches_compiling_the_whole(self):
+        for text in ["1-2-3", "2×3-4+5", "1e+16-1+0.5", "-(1-2)^2+3÷4-√9", "2^10-2^9+7", "1.5-2×(3-4.25)"]:
+            whole = pycalc_expr.finalize(compile_ast(parse(text))(None))
+            self.assertEqual(evaluate(text), whole, text)
+
+
+class CacheTest(unittest.TestCase):
+    def setUp(self):
+        pycalc_expr.clear_cache()
+        self.addCleanup(pycalc_expr.clear_cache)
+
+    def test_terms_are_compiled_once(self):
+        evaluate("1+2")
+        evaluate("2-1+2")
+        info = pycalc_expr.cache_info()
+        # '1' and '2' are cached by the first expression and reused by the second
+        self.assertEqual(info.misses, 2)
+        self.assertEqual(info.hits, 3)
+        self.assertIs(compile_expression("3 × 4"), compile_expression("3×4"))
+
+    def test_cache_is_bounded(self):
+        self.assertEqual(pycalc_expr.cache_info().maxsize, pycalc_expr.EXPR_CACHE_SIZE)
+        for i in range(pycalc_expr.EXPR_CACHE_SIZE + 10):
+            evaluate(f"{i}×2")
+        self.assertEqual(pycalc_expr.cache_info().currsize, pycalc_expr.EXPR_CACHE_SIZE)
+
+    def test_big_int_values_are_not_kept(self):
+        small = compile_expression("2^100")
+        big = compile_expression("2^100000")
+        self.assertEqual(small(), 2 ** 100)
+        self.assertEqual(big(), 2 ** 100000)
+        self.assertEqual(small._value, 2 ** 100)
+        self.assertIsNone(big._value)
+        self.assertGreater((2 ** 100000).bit_length(), VALUE_CACHE_BITS)
+
+
+class EstimateTest(unittest.TestCase):
+    def test_estimates(self):
+        self.assertEqual(estimate_digits("12×345"), 5)
+        self.assertEqual(estimate_digits("10^100"), 101)
+        self.assertEqual(estimate_digits("2^(10^40)"), float('inf'))
+        self.assertEqual(estimate_digits("2+"), 0)
+
+
+class ExpressionInputTest(unittest.TestCase):
+    def press(self, keys):
+        expression = ExpressionInput()
+        for key in keys:
+            expression.press(key)
+        return expression
+
+    def test_keys_become_tokens(self):
+        expression = self.press(['1', '2', 'xʸ', '2', '×', '√x', '9', 'x²'])
+        self.assertEqual(expression.text(), "12^2×√9²")
+
+    def test_backspace_and_clear(self):
+        expression = self.press(['1', '2', '+', '⌫', '⌫'])
+        self.assertEqual(expression.text(), "1")
+        expression.press('CE')
+        self.assertTrue(expression.is_empty())
+        expression.press('⌫')
+        self.assertTrue(expression.is_empty())
+
+    def test_toggle_sign_of_last_number(self):
+        expression = self.press(['1', '2', '+', '3'])
+        expression.press('+/-')
+        self.assertEqual(expression.text(), "12+-3")
+        expression.press('+/-')
+        self.assertEqual(expression.text(), "12+3")
+
+    def test_shared_buffer_is_not_changed_by_later_keys(self):
+        # Undo steps keep (tokens, size) and rely on the list never changing in place
+        expression = self.press(['1', '2', '3'])
+        tokens, size = expression.tokens, expression.size
+        expression.press('⌫')
+        expression.press('9')
+        self.assertEqual(tokens[:size], ['1', '2', '3'])
+        self.assertEqual(expression.text(), "129")
+
+
+if __name__ == "__main__":
+    unittest.main()
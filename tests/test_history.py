@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# Tests for the history store in pycalc_history: writes in the background,
+# paged and searched reads across the in-memory ring and SQLite, and reads on
+# the search thread.
+#   python -m pytest tests   (or python -m unittest discover tests)
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pycalc_history import HistoryStore
+
+
+class _Store:
+    # A store in a temporary directory, closed after each test
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "history.sqlite3")
+
+    def open(self, ring_size=10):
+        store = HistoryStore(self.path, ring_size=ring_size)
+        self.addCleanup(store.close)
+        return store
+
+    def fill(self, store, count):
+        for i in range(count):
+            store.append(f"{i} + 1 =", str(i + 1))
+
+
+class HistoryStoreTest(_Store, unittest.TestCase):
+    def test_entries_reach_disk_and_survive_reopening(self):
+        store = self.open()
+        self.fill(store, 25)
+        self.assertEqual(store.count(), 25)
+        store.close()
+        reopened = self.open()
+        self.assertEqual(reopened.count(), 25)
+        entry = reopened.append("x", "y")
+        self.assertEqual(entry.id, 26)
+
+    def test_pages_run_newest_first_across_ring_and_disk(self):
+        store = self.open(ring_size=10)
+        self.fill(store, 35)
+        ids = []
+        before = None
+        while True:
+            page = store.page(before, 8)
+            ids += [entry.id for entry in page]
+            if len(page) < 8:
+                break
+            before = page[-1].id
+        self.assertEqual(ids, list(range(35, 0, -1)))
+
+    def test_search(self):
+        store = self.open(ring_size=5)
+        self.fill(store, 200)
+        # Entry i is "i + 1 =" with result i + 1, so a needle can match either
+        self.assertEqual([entry.result for entry in store.page(None, 50, "99")], ["200", "199", "100", "99"])
+        expected = [i + 1 for i in range(149, -1, -1) if "15" in f"{i} + 1 = {i + 1}"]
+        self.assertEqual([entry.id for entry in store.page(151, 50, "15")], expected)
+        self.assertEqual(store.page(None, 50, "no such text"), [])
+
+    def test_page_right_after_append_sees_unwritten_entries(self):
+        store = self.open(ring_size=3)
+        self.fill(store, 500)
+        page = store.page(None, 500)
+        self.assertEqual(len(page), 500)
+        self.assertEqual(page[-1].expression, "0 + 1 =")
+
+
+class SearchThreadTest(_Store, unittest.TestCase):
+    def page_async(self, store, before, limit, needle):
+        done = threading.Event()
+        result = []
+
+        def answer(entries):
+            result.append(entries)
+            done.set()
+
+        store.page_async(before, limit, needle, answer)
+        self.assertTrue(done.wait(10))
+        return result[0]
+
+    def test_same_pages_as_page(self):
+        store = self.open(ring_size=5)
+        self.fill(store, 120)
+        for before, needle in [(None, ""), (60, ""), (None, "7"), (100, "1")]:
+            self.assertEqual([e.id for e in self.page_async(store, before, 20, needle)],
+                             [e.id for e in store.page(before, 20, needle)])
+
+    def test_cancelled_requests_are_not_answered(self):
+        store = self.open()
+        self.fill(store, 50)
+        stale = []
+        store.page_async(None, 10, "1", stale.append)
+        store.cancel_reads()
+        fresh = self.page_async(store, None, 10, "2")
+        self.assertEqual(stale, [])
+        self.assertTrue(all("2" in entry.text() for entry in fresh))
+
+    def test_close_stops_the_search_thread(self):
+        store = self.open()
+        self.fill(store, 5)
+        self.page_async(store, None, 5, "")
+        store.close()
+        self.assertFalse(store._searcher.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# Tests for single-instance mode in pycalc_instance: the JSON line protocol
+# between a launch and the resident copy's QLocalServer, and --eval answered
+# without a resident copy. The socket lives in a temporary directory.
+#   python -m pytest tests   (or python -m unittest discover tests)
+import os
+import sys
+import time
+import tempfile
+import subprocess
+import threading
+import unittest
+import unittest.mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+import pycalc_instance
+from pycalc_instance import evaluate_request, hand_off, send_request
+
+try:
+    from PySide6.QtCore import QCoreApplication, QTimer
+except ImportError:
+    QCoreApplication = None
+
+
+class EvaluateRequestTest(unittest.TestCase):
+    def test_result_in_full(self):
+        self.assertEqual(evaluate_request("2^64-1", 100), {"ok": True, "result": "18446744073709551615"})
+        reply = evaluate_request("10^5000", 10000)
+        self.assertEqual(reply["result"], "1" + "0" * 5000)
+        self.assertEqual(evaluate_request("1÷4", 100), {"ok": True, "result": "0.25"})
+
+    def test_errors(self):
+        self.assertEqual(evaluate_request("2^400", 100), {"ok": False, "error": "result too large"})
+        self.assertEqual(evaluate_request("1÷0", 100), {"ok": False, "error": "division by zero"})
+        self.assertEqual(evaluate_request("(1", 100), {"ok": False, "error": "expected ')'"})
+
+
+class _Socket:
+    # Points client and server at a socket of this test's own
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        name = os.path.join(directory.name, "test.sock") if os.name != 'nt' else f"PyCalc-SE-test-{os.getpid()}"
+        original = pycalc_instance.server_name
+        pycalc_instance.server_name = lambda: name
+        self.addCleanup(setattr, pycalc_instance, 'server_name', original)
+
+
+class NoResidentInstanceTest(_Socket, unittest.TestCase):
+    def test_request_without_server_is_none(self):
+        self.assertIsNone(send_request({"cmd": "ping"}))
+
+    def test_eval_is_answered_in_process(self):
+        with unittest.mock.patch("sys.stdout") as stdout:
+            self.assertEqual(hand_off(["--eval", "6×7"]), 0)
+        self.assertEqual("".join(call.args[0] for call in stdout.write.call_args_list), "42\n")
+        with unittest.mock.patch("sys.stderr"):
+            self.assertEqual(hand_off(["--eval", "1÷0"]), 1)
+
+    def test_other_launches_start_the_window(self):
+        self.assertIsNone(hand_off(["--single-instance"]))
+        self.assertIsNone(hand_off([]))
+
+
+@unittest.skipIf(QCoreApplication is None, "needs PySide6")
+class ServerTest(_Socket, unittest.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.app = QCoreApplication.instance() or QCoreApplication([])
+        self.requests = []
+        self.server = pycalc_instance.start_server(self.handle)
+        self.assertIsNotNone(self.server)
+        self.addCleanup(self.server.close)
+
+    def handle(self, request, reply):
+        self.requests.append(request)
+        if request["cmd"] == "eval":
+            # Answered later, as the window does once its worker process is done
+            QTimer.singleShot(50, lambda: reply(evaluate_request(request["expr"], 10000)))
+        elif request["cmd"] == "fail":
+            raise RuntimeError("handler failed")
+        else:
+            reply({"ok": True})
+
+    def ask(self, request):
+        # send_request() blocks, so it runs on a thread while the event loop serves it
+        result = []
+        thread = threading.Thread(target=lambda: result.append(send_request(request)))
+        thread.start()
+        deadline = time.monotonic() + 10
+        while thread.is_alive() and time.monotonic() < deadline:
+            self.app.processEvents()
+            time.sleep(0.002)
+        thread.join()
+        return result[0]
+
+    def test_immediate_and_deferred_replies(self):
+        self.assertEqual(self.ask({"cmd": "show"}), {"ok": True})
+        self.assertEqual(self.ask({"cmd": "eval", "expr": "2^64-1"}), {"ok": True, "result": str(2 ** 64 - 1)})
+        self.assertEqual([r["cmd"] for r in self.requests], ["show", "eval"])
+
+    def test_long_reply(self):
+        reply = self.ask({"cmd": "eval", "expr": "7^5000"})
+        self.assertEqual(reply["result"], str(7 ** 5000))
+
+    def test_handler_error_is_the_reply(self):
+        self.assertEqual(self.ask({"cmd": "fail"}), {"ok": False, "error": "handler failed"})
+
+    def test_second_instance_defers_to_the_first(self):
+        # Another launch, in a process of its own, while this one serves the ping
+        code = ("import sys, pycalc_instance; from PySide6.QtCore import QCoreApplication; "
+                "app = QCoreApplication([]); pycalc_instance.server_name = lambda: sys.argv[1]; "
+                "print(pycalc_instance.start_server(lambda request, reply: reply({})) is None)")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        child = subprocess.Popen([sys.executable, "-c", code, pycalc_instance.server_name()], cwd=root,
+                                 stdout=subprocess.PIPE, text=True)
+        while child.poll() is None:
+            self.app.processEvents()
+            time.sleep(0.002)
+        self.assertEqual(child.stdout.read().strip(), "True")
+        child.stdout.close()
+        self.assertEqual(self.ask({"cmd": "ping"}), {"ok": True})
+
+    def test_stale_socket_is_replaced(self):
+        self.server.close()
+        if os.name != 'nt':
+            # A crashed instance leaves its socket file behind
+            import socket
+            stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            stale.bind(pycalc_instance.server_name())
+            stale.close()
+        server = pycalc_instance.start_server(self.handle)
+        self.assertIsNotNone(server)
+        self.addCleanup(server.close)
+        self.server = server
+        self.assertEqual(self.ask({"cmd": "ping"}), {"ok": True})
+
+
+if __name__ == "__main__":
+    unittest.main()
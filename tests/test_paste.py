@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# Tests for summing pasted numbers in pycalc_paste, and for the sum reaching
+# the engine the way the window's Ctrl+V hands it over.
+#   python -m pytest tests   (or python -m unittest discover tests)
+import os
+import sys
+import random
+import decimal
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pycalc_paste
+from pycalc_paste import summarize, history_text
+from pycalc_engine import CalculatorEngine
+from pycalc_compute import run_job
+
+
+def paste_into(engine, text):
+    summary = summarize(text, engine.max_result_digits)
+    engine.set_value(summary.total, history_text(summary))
+
+
+class SummarizeTest(unittest.TestCase):
+    def test_decimal_sum_is_exact(self):
+        summary = summarize("0.1\n0.2\n")
+        self.assertEqual(summary.total, 0.3)
+        self.assertEqual((summary.count, summary.mean, summary.minimum, summary.maximum), (2, 0.15, 0.1, 0.2))
+
+    def test_whole_numbers_stay_ints(self):
+        summary = summarize("1\n2\n3\n4")
+        self.assertEqual((summary.total, summary.mean, summary.minimum, summary.maximum), (10, 2.5, 1, 4))
+        self.assertIs(type(summary.total), int)
+        self.assertIs(type(summarize("2\n4").mean), int)
+        big = summarize("\n".join([str(10 ** 400)] * 3))
+        self.assertEqual(big.total, 3 * 10 ** 400)
+        self.assertEqual(big.mean, 10 ** 400)
+
+    def test_separators(self):
+        self.assertEqual(summarize("10;20\t30 40").total, 100)
+        self.assertEqual(summarize("1,2,3").total, 6)
+        self.assertEqual(summarize("1,234.50\n5").total, 1239.5)
+        self.assertEqual(summarize("−5\n5").minimum, -5)
+
+    def test_other_text_is_skipped_and_counted(self):
+        summary = summarize("Total\n$5\n10;20\t30\nNaN\ninf")
+        self.assertEqual((summary.count, summary.total, summary.skipped), (3, 60, 4))
+
+    def test_errors(self):
+        with self.assertRaises(ValueError):
+            summarize("no numbers here")
+        with self.assertRaises(OverflowError):
+            summarize("9" * 50, max_digits=40)
+        with self.assertRaises(OverflowError):
+            summarize("0.5\n" + "9" * 50, max_digits=40)
+
+    def test_chunks_add_up_like_one_pass(self):
+        # Small chunks mix whole-number, decimal and messy chunks in one paste
+        original = pycalc_paste._CHUNK_CHARS
+        pycalc_paste._CHUNK_CHARS = 16
+        self.addCleanup(setattr, pycalc_paste, '_CHUNK_CHARS', original)
+        rng = random.Random(22)
+        lines = []
+        for _ in range(500):
+            kind = rng.randrange(4)
+            if kind == 0:
+                lines.append(str(rng.randrange(-10 ** 6, 10 ** 6)))
+            elif kind == 1:
+                lines.append(f"{rng.randrange(10 ** 4)}.{rng.randrange(100):02d}")
+            elif kind == 2:
+                lines.append("n/a")
+            else:
+                lines.append(f"{rng.randrange(1, 999)},{rng.randrange(1000):03d}")
+        expected = decimal.Decimal(0)
+        for line in lines:
+            if line != "n/a":
+                expected += decimal.Decimal(line.replace(',', ''))
+        summary = summarize("\n".join(lines))
+        self.assertEqual(decimal.Decimal(repr(summary.total)), expected)
+        self.assertEqual(summary.skipped, lines.count("n/a"))
+
+    def test_worker_job_gives_the_same_summary(self):
+        summary = run_job(('paste', "1\n2\n3", 100))
+        self.assertEqual((summary.count, summary.total), (3, 6))
+
+
+class HistoryTextTest(unittest.TestCase):
+    def test_history_line(self):
+        self.assertEqual(history_text(summarize("1\n2")), "2 values · min 1 · max 2 · mean 1.5 · Σ =")
+        self.assertEqual(history_text(summarize("x 3")), "1 value · min 3 · max 3 · mean 3 · 1 skipped · Σ =")
+
+    def test_single_number_needs_no_history(self):
+        self.assertEqual(history_text(summarize("7")), "")
+
+
+class PasteIntoEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.engine = CalculatorEngine()
+        self.engine.max_result_digits = 1000
+        self.engine.enable_undo()
+
+    def test_sum_continues_the_chain(self):
+        paste_into(self.engine, "1\n2\n3")
+        self.assertEqual(self.engine.feed("×2="), "12")
+
+    def test_sum_fills_pending_operator(self):
+        self.engine.feed("5+")
+        paste_into(self.engine, "1\n2\n3")
+        self.assertEqual(self.engine.feed("="), "11")
+        self.engine.feed("×")
+        paste_into(self.engine, "2 2")
+        self.assertEqual(self.engine.feed("="), "44")
+
+    def test_paste_is_one_undo_step(self):
+        self.engine.feed("5+")
+        paste_into(self.engine, "1\n2\n3")
+        self.engine.undo()
+        self.assertEqual(self.engine.feed("1="), "6")
+
+
+if __name__ == "__main__":
+    unittest.main()
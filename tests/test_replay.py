@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# Tests for key recordings in pycalc_replay: the file format, and headless
+# replay giving the same result as the session that was recorded.
+#   python -m pytest tests   (or python -m unittest discover tests)
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pycalc_replay
+from pycalc_replay import KeyRecorder, PASTE_TOKEN, UNDO_TOKEN, decode, encode, load, replay_headless
+
+
+class _Window:
+    # Stands in for the calculator window: the entry points KeyRecorder wraps
+    def __init__(self):
+        self.calls = []
+        for name in ('toggle_expression_mode', 'undo', 'redo'):
+            setattr(self, name, lambda name=name: self.calls.append(name))
+
+    def on_button(self, token):
+        self.calls.append(token)
+
+    def paste_text(self, text):
+        self.calls.append(('paste_text', text))
+
+
+class RecordingTest(unittest.TestCase):
+    TOKENS = ['5', '+', (PASTE_TOKEN, '1\n2\n"3" and V\n'), '=', 'xʸ', '2', '=', UNDO_TOKEN, 'CE']
+
+    def temporary_directory(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return directory.name
+
+    def test_encode_decode_round_trip(self):
+        self.assertEqual(decode(encode(self.TOKENS)), self.TOKENS)
+        self.assertEqual(decode("12+3=\n"), ['1', '2', '+', '3', '='])
+
+    def test_recorder_writes_pastes_and_keys(self):
+        directory = self.temporary_directory()
+        path = os.path.join(directory, "session.keys")
+        window = _Window()
+        recorder = KeyRecorder(path)
+        recorder.install(window)
+        window.on_button('5')
+        window.on_button('+')
+        window.paste_text("1\n2\n")
+        window.undo()
+        window.on_button('=')
+        recorder.close()
+        self.assertEqual(window.calls, ['5', '+', ('paste_text', "1\n2\n"), 'undo', '='])
+        self.assertEqual(load(path), ['5', '+', (PASTE_TOKEN, "1\n2\n"), UNDO_TOKEN, '='])
+
+    def test_version_1_recordings_still_load(self):
+        directory = self.temporary_directory()
+        path = os.path.join(directory, "old.keys")
+        with open(path, "w", encoding="utf-8", newline="\n") as f:
+            f.write("#pycalc-keys 1\n2^10=\n")
+        self.assertEqual(load(path), ['2', 'xʸ', '1', '0', '='])
+
+    def test_headless_replay_uses_pasted_text(self):
+        self.assertEqual(replay_headless(['5', '+', (PASTE_TOKEN, "1\n2\n3\n"), '='])["display"], "11")
+        # "8 ×" after a result takes the pasted sum as its operand
+        tokens = ['5', '+', '3', '=', '×', (PASTE_TOKEN, "2 2"), '=', UNDO_TOKEN, '+', '1', '=']
+        self.assertEqual(replay_headless(tokens)["display"], "33")
+
+    def test_failed_paste_changes_nothing(self):
+        self.assertEqual(replay_headless(['7', (PASTE_TOKEN, "no numbers"), '+', '1', '='])["display"], "8")
+
+    def test_controls_include_paste(self):
+        window = _Window()
+        pycalc_replay.controls(window)[PASTE_TOKEN]("4")
+        self.assertEqual(window.calls, [('paste_text', "4")])
+
+
+if __name__ == "__main__":
+    unittest.main()
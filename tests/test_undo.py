@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# Tests for undo and redo in pycalc_engine: one step per key, snapshots that
+# share the input buffers, and the depth and byte bounds of UndoHistory.
+#   python -m pytest tests   (or python -m unittest discover tests)
+import os
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pycalc_engine import CalculatorEngine, UndoHistory
+from pycalc_compute import DEFAULT_MAX_DIGITS
+
+KEYS = ['0', '1', '2', '5', '9', '.', '+', '-', '×', '÷', 'xʸ', '=', '⌫', 'CE', '+/-', 'x²', '√x']
+
+
+def make_engine(**undo):
+    engine = CalculatorEngine()
+    engine.max_result_digits = DEFAULT_MAX_DIGITS
+    engine.enable_undo(**undo)
+    return engine
+
+
+def screen(engine):
+    return engine.display_text(), engine.expression_history
+
+
+class UndoRedoTest(unittest.TestCase):
+    def test_each_key_is_one_step(self):
+        engine = make_engine()
+        engine.feed("12+3")
+        self.assertTrue(engine.undo())
+        self.assertEqual(screen(engine), ("12", "12 + "))
+        self.assertTrue(engine.undo())
+        self.assertEqual(screen(engine), ("12", ""))
+        self.assertTrue(engine.redo())
+        self.assertTrue(engine.redo())
+        self.assertEqual(engine.feed("="), "15")
+
+    def test_key_that_changes_nothing_leaves_no_step(self):
+        engine = make_engine()
+        engine.feed("7")
+        engine.feed("⌫⌫⌫")
+        self.assertTrue(engine.undo())
+        self.assertEqual(engine.display_text(), "7")
+        self.assertTrue(engine.undo())
+        self.assertEqual(engine.display_text(), "0")
+        self.assertFalse(engine.undo())
+
+    def test_new_key_clears_redo(self):
+        engine = make_engine()
+        engine.feed("12")
+        engine.undo()
+        engine.feed("3")
+        self.assertFalse(engine.redo())
+        self.assertEqual(engine.display_text(), "13")
+
+    def test_undo_after_result_and_error(self):
+        engine = make_engine()
+        self.assertEqual(engine.feed("1÷0="), "Error")
+        engine.undo()
+        self.assertEqual(engine.feed("2="), "0.5")
+        engine.undo()
+        engine.undo()
+        self.assertEqual(engine.display_text(), "0")
+
+    def test_expression_mode(self):
+        engine = make_engine()
+        engine.set_expression_mode(True)
+        engine.feed("2×(3+4)")
+        engine.undo()
+        engine.undo()
+        self.assertEqual(engine.display_text(), "2×(3+")
+        engine.feed("1)=")
+        self.assertEqual(engine.display_text(), "8")
+        engine.undo()
+        self.assertEqual(engine.display_text(), "2×(3+1)")
+
+    def test_random_sessions_undo_back_through_every_screen(self):
+        rng = random.Random(19)
+        for _ in range(200):
+            engine = make_engine()
+            screens = [screen(engine)]
+            for key in rng.choices(KEYS, k=rng.randrange(1, 40)):
+                engine.press(key)
+                if screen(engine) != screens[-1]:
+                    screens.append(screen(engine))
+            seen = [screen(engine)]
+            while engine.undo():
+                if screen(engine) != seen[-1]:
+                    seen.append(screen(engine))
+            self.assertEqual(seen, screens[::-1])
+            while engine.redo():
+                pass
+            self.assertEqual(screen(engine), screens[-1])
+
+
+class SnapshotTest(unittest.TestCase):
+    def test_snapshots_share_the_entry_buffer(self):
+        engine = make_engine()
+        engine.feed("123456")
+        first = engine.capture()
+        engine.feed("7")
+        second = engine.capture()
+        self.assertIs(first.entry[0], second.entry[0])
+        self.assertEqual((first.entry[1], second.entry[1]), (6, 7))
+
+    def test_backspace_then_different_digit_keeps_older_steps(self):
+        engine = make_engine()
+        engine.feed("123")
+        engine.feed("⌫4")
+        self.assertEqual(engine.display_text(), "124")
+        engine.undo()
+        engine.undo()
+        self.assertEqual(engine.display_text(), "123")
+
+    def test_snapshot_of_long_input_is_constant_size(self):
+        engine = make_engine()
+        engine.input_digits("9" * 100000)
+        engine.feed("8")
+        history = engine.undo_history
+        before = history.bytes
+        engine.feed("7")
+        # One more digit costs one list slot, not another copy of the buffer
+        self.assertLess(history.bytes - before, 100)
+
+
+class BoundsTest(unittest.TestCase):
+    def test_depth(self):
+        engine = make_engine(depth=5)
+        engine.feed("123456789")
+        steps = 0
+        while engine.undo():
+            steps += 1
+        self.assertEqual(steps, 5)
+        self.assertEqual(engine.display_text(), "1234")
+
+    def test_bytes_of_big_results(self):
+        engine = make_engine(max_bytes=100000)
+        for _ in range(20):
+            engine.feed("C9xʸ99999=")
+        history = engine.undo_history
+        self.assertLessEqual(history.bytes, 100000 + 50000)
+        self.assertTrue(history.can_undo())
+
+    def test_zero_depth_disables_undo(self):
+        engine = make_engine(depth=0)
+        engine.feed("1")
+        self.assertFalse(engine.undo())
+        self.assertIsNone(engine.undo_history)
+
+    def test_clear(self):
+        history = UndoHistory()
+        engine = make_engine()
+        history.record(engine)
+        engine.feed("5")
+        self.assertTrue(history.can_undo())
+        history.clear()
+        self.assertFalse(history.can_undo())
+        self.assertEqual(history.bytes, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# Tests for the update check in pycalc_update, against a local stand-in for the
+# version file server and a dict in place of QSettings.
+#   python -m pytest tests   (or python -m unittest discover tests)
+import os
+import sys
+import threading
+import unittest
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pycalc_update import (fetch_latest_version, parse_version, update_message, KEY_VERSION,
+                           KEY_CHECKED_AT, KEY_ETAG, KEY_LAST_MODIFIED)
+
+
+class DictSettings:
+    # The part of QSettings the update check uses
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+
+    def value(self, key, default=None):
+        return self.values.get(key, default)
+
+    def setValue(self, key, value):
+        self.values[key] = value
+
+
+class _VersionHandler(BaseHTTPRequestHandler):
+    # Serves the server's current version, answering 304 when the client's ETag or
+    # Last-Modified still matches; every request's headers are recorded
+    def do_GET(self):
+        server = self.server
+        server.seen.append(dict(self.headers))
+        if self.path != "/PyC_SE_V.txt":
+            self.send_error(404)
+            return
+        if (self.headers.get("If-None-Match") == server.etag
+                or self.headers.get("If-Modified-Since") == server.last_modified):
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = server.version.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", server.etag)
+        self.send_header("Last-Modified", server.last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class FetchLatestVersionTest(unittest.TestCase):
+    NOW = 1_700_000_000.0
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _VersionHandler)
+        self.server.seen = []
+        self.publish("1.5", '"v1"', "Mon, 01 Jan 2024 00:00:00 GMT")
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/PyC_SE_V.txt"
+
+    def publish(self, version, etag, last_modified):
+        self.server.version = version
+        self.server.etag = etag
+        self.server.last_modified = last_modified
+
+    def test_first_check_fetches_and_stores_validators(self):
+        settings = DictSettings()
+        self.assertEqual(fetch_latest_version(self.url, settings, now=self.NOW), "1.5")
+        self.assertEqual(len(self.server.seen), 1)
+        self.assertNotIn("If-None-Match", self.server.seen[0])
+        self.assertEqual(settings.values[KEY_VERSION], "1.5")
+        self.assertEqual(settings.values[KEY_ETAG], '"v1"')
+        self.assertEqual(settings.values[KEY_LAST_MODIFIED], "Mon, 01 Jan 2024 00:00:00 GMT")
+        self.assertEqual(settings.values[KEY_CHECKED_AT], self.NOW)
+
+    def test_check_inside_ttl_skips_the_network(self):
+        settings = DictSettings({KEY_VERSION: "1.5", KEY_CHECKED_AT: self.NOW - 60})
+        self.publish("1.6", '"v2"', "Tue, 02 Jan 2024 00:00:00 GMT")
+        self.assertEqual(fetch_latest_version(self.url, settings, ttl=3600, now=self.NOW), "1.5")
+        self.assertEqual(self.server.seen, [])
+        # QSettings hands numbers back as strings
+        settings.values[KEY_CHECKED_AT] = str(self.NOW - 60)
+        self.assertEqual(fetch_latest_version(self.url, settings, ttl=3600, now=self.NOW), "1.5")
+        self.assertEqual(self.server.seen, [])
+
+    def test_expired_check_sends_validators_and_keeps_version_on_304(self):
+        settings = DictSettings()
+        fetch_latest_version(self.url, settings, ttl=3600, now=self.NOW)
+        later = self.NOW + 7200
+        self.assertEqual(fetch_latest_version(self.url, settings, ttl=3600, now=later), "1.5")
+        self.assertEqual(len(self.server.seen), 2)
+        self.assertEqual(self.server.seen[1].get("If-None-Match"), '"v1"')
+        self.assertEqual(self.server.seen[1].get("If-Modified-Since"), "Mon, 01 Jan 2024 00:00:00 GMT")
+        self.assertEqual(settings.values[KEY_VERSION], "1.5")
+        self.assertEqual(settings.values[KEY_ETAG], '"v1"')
+        self.assertEqual(settings.values[KEY_CHECKED_AT], later)
+
+    def test_expired_check_refreshes_version_and_validators_on_200(self):
+        settings = DictSettings()
+        fetch_latest_version(self.url, settings, ttl=3600, now=self.NOW)
+        self.publish("1.10", '"v2"', "Tue, 02 Jan 2024 00:00:00 GMT")
+        later = self.NOW + 7200
+        self.assertEqual(fetch_latest_version(self.url, settings, ttl=3600, now=later), "1.10")
+        self.assertEqual(self.server.seen[1].get("If-None-Match"), '"v1"')
+        self.assertEqual(settings.values[KEY_VERSION], "1.10")
+        self.assertEqual(settings.values[KEY_ETAG], '"v2"')
+        self.assertEqual(settings.values[KEY_LAST_MODIFIED], "Tue, 02 Jan 2024 00:00:00 GMT")
+        self.assertEqual(settings.values[KEY_CHECKED_AT], later)
+        # The next launch inside the TTL answers from the refreshed settings
+        self.assertEqual(fetch_latest_version(self.url, settings, ttl=3600, now=later + 1), "1.10")
+        self.assertEqual(len(self.server.seen), 2)
+
+    def test_clock_moved_back_checks_again(self):
+        settings = DictSettings({KEY_VERSION: "1.5", KEY_CHECKED_AT: self.NOW + 600})
+        fetch_latest_version(self.url, settings, ttl=3600, now=self.NOW)
+        self.assertEqual(len(self.server.seen), 1)
+
+    def test_http_error_raises_and_keeps_settings(self):
+        settings = DictSettings()
+        with self.assertRaises(requests.HTTPError):
+            fetch_latest_version(self.url.replace("PyC_SE_V", "missing"), settings, now=self.NOW)
+        self.assertEqual(settings.values, {})
+
+
+class VersionTest(unittest.TestCase):
+    def test_parse_version_compares_numerically(self):
+        self.assertGreater(parse_version("1.10"), parse_version("1.5"))
+        self.assertEqual(parse_version("v2.0-beta"), (2,))
+        self.assertEqual(parse_version("1.5"), parse_version("1.5.0"))
+
+    def test_update_message(self):
+        self.assertIn("v1.10 is OUT NOW", update_message("1.10", "1.5"))
+        self.assertEqual(update_message("1.5", "1.5.0"), "🎉 PyCalc-SE is up to date!")
+        self.assertIn("Dev. Build", update_message("1.5", "1.10"))
+
+
+if __name__ == "__main__":
+    unittest.main()